@@ -1,5 +1,8 @@
+import hashlib
+import os
+import threading
 import numpy as np
-from PIL import Image
+from itertools import permutations
 
 EMPTY = 0
 WALL = 1
@@ -11,320 +14,807 @@ SMOKE_LIGHT = 6
 WATER = 7
 ICE = 8
 
-textures = {
-    EMPTY: np.array(Image.open("tiles/empty.png").convert("RGB")),
-    WALL: np.array(Image.open("tiles/wall.png").convert("RGB")),
-    SAND: np.array(Image.open("tiles/sand.png").convert("RGB")),
-    WOOD: np.array(Image.open("tiles/wood.png").convert("RGB")),
-    FIRE: np.array(Image.open("tiles/fire.png").convert("RGB")),
-    SMOKE_DARK: np.array(Image.open("tiles/smoke_dark.png").convert("RGB")),
-    SMOKE_LIGHT: np.array(Image.open("tiles/smoke_light.png").convert("RGB")),
-    WATER: [
-        np.array(Image.open("tiles/light_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/medium_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/dark_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/full_blue.png").convert("RGB")),
-    ],
-    ICE: np.array(Image.open("tiles/ice.png").convert("RGB"))
-}
+# Compact cell storage: 1 + 4 + 1 = 6 bytes per cell instead of 24 (int64/float64/int64)
+CELL_DTYPE = np.uint8  # Material code 0..8
+WATER_DTYPE = np.float32  # Water level
+SMOKE_DTYPE = np.uint8  # Generations of smoke left (at most 255)
 
+# Texture files in atlas order: materials EMPTY..ICE (WATER = 1/4 level), then water 1/2, 3/4 and full
+TILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiles")
+TILE_FILES = ["empty.png", "wall.png", "sand.png", "wood.png", "fire.png", "smoke_dark.png", "smoke_light.png",
+              "light_blue.png", "ice.png", "medium_blue.png", "dark_blue.png", "full_blue.png"]
+tiles = None  # Decoded textures (n_tiles, TILE_PX, TILE_PX, 3), loaded on first use (see load_tiles)
+
+# Fields of the module-level world, only used by the grid-only functions (create_initial_state,
+# generate_next_gen, animate, ...). New code should keep its fields in a World instead.
 smoke_life = None
 water_amount = None
+profiler = None  # profiler.StepProfiler for the steps of the module-level world
 
-# Function for creating initial 2D state
-def create_initial_state(size):
-    global smoke_life, water_amount
-    grid = np.random.choice([EMPTY, WALL, SAND, WOOD, FIRE],
+# Function for creating initial world
+# With a seed the layout and every step are reproducible (see World.step_rng)
+def create_initial_world(size, seed=None):
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    grid = rng.choice([EMPTY, WALL, SAND, WOOD, FIRE],
                             size=(size, size),
-                            p = [0.2, 0.2, 0.2, 0.2, 0.2])
-
-    global smoke_life
-    smoke_life = np.zeros((size, size), dtype=int)
-    water_amount = np.zeros((size, size), dtype=float)
+                            p = [0.2, 0.2, 0.2, 0.2, 0.2]).astype(CELL_DTYPE)
 
     # Fixed border
     grid[0, :] = WALL
     grid[:, 0] = WALL
     grid[-1, :] = WALL
     grid[:, -1] = WALL
-    return grid
-
-# Function for generating next generation
-def generate_next_gen(grid, steps, water_amount):
-    global smoke_life
-    if smoke_life is None or smoke_life.shape != grid.shape:
-        smoke_life = np.zeros_like(grid, dtype=int)
-
-    if water_amount is None or water_amount.shape != grid.shape:
-        water_amount = np.zeros_like(grid, dtype=float)
+    return World(grid, seed=seed)
 
-    new_grid = np.copy(grid) # Copy the grid to avoid in-place changes
+# Function for creating initial 2D state (the other fields go to the module-level world)
+def create_initial_state(size):
+    global smoke_life, water_amount
+    world = create_initial_world(size)
+    smoke_life, water_amount = world.smoke_life, world.water_amount
+    return world.grid
+
+# Function for picking the order of directions from a random number in [0, 1)
+def random_order(directions, u):
+    orders = list(permutations(directions))
+    return orders[int(u * len(orders))]
+
+# Function for updating one cell (scan order matters, see generate_next_gen)
+# rand holds one random number per cell for the random direction choices
+def update_cell(grid, new_grid, water_amount, smoke_life, i, j, rand):
     rows, cols = grid.shape
 
-    for i in range(rows-2, 0, -1):
-        for j in range(1, cols-1):
-            if grid[i, j] == WALL:
-                continue  # Wall stays in the same place
+    if grid[i, j] == WALL:
+        return  # Wall stays in the same place
 
-            if grid[i, j] == SAND:
-                # 1. iF there is empty space below, sand falls down
-                if i < grid.shape[0] - 1 and grid[i + 1, j] in [EMPTY, WALL, WOOD]: # Check bottom boundary and empty space
+    if grid[i, j] == SAND:
+        # 1. iF there is empty space below, sand falls down
+        if i < grid.shape[0] - 1 and grid[i + 1, j] in [EMPTY, WALL, WOOD]: # Check bottom boundary and empty space
 
-                    # Check if the cell below is wall or wood
-                    if grid[i + 1, j] == WALL or grid[i + 1, j] == WOOD:
-                        new_grid[i, j] = SAND
+            # Check if the cell below is wall or wood
+            if grid[i + 1, j] == WALL or grid[i + 1, j] == WOOD:
+                new_grid[i, j] = SAND
 
-                    # If the cell below is empty, move sand down
-                    elif grid[i + 1, j] == EMPTY:
-                        new_grid[i, j] = EMPTY
-                        new_grid[i + 1, j] = SAND
+            # If the cell below is empty, move sand down
+            elif grid[i + 1, j] == EMPTY:
+                new_grid[i, j] = EMPTY
+                new_grid[i + 1, j] = SAND
 
-                # 2. If there is water below, sand displaces water
-                elif i < grid.shape[0] - 1 and grid[i + 1, j] == WATER:
-                    moved = False
+        # 2. If there is water below, sand displaces water
+        elif i < grid.shape[0] - 1 and grid[i + 1, j] == WATER:
+            moved = False
 
-                    # Try to displace water left/right
-                    directions = [(0, -1), (0, 1)]
-                    np.random.shuffle(directions)
+            # Try to displace water left/right
+            directions = random_order([(0, -1), (0, 1)], rand[i, j])
 
-                    for di, dj in directions:
-                        ni, nj = i + 1, j + dj
+            for di, dj in directions:
+                ni, nj = i + 1, j + dj
 
-                        if 0 <= nj < grid.shape[1] and grid[ni, nj] == EMPTY:
-                            # Move water left/right
-                            new_grid[ni, nj] = WATER
-                            new_grid[i + 1, j] = SAND
-                            moved = True
-                            break  # IF there is no option to move left/right -> Swap places with water
+                if 0 <= nj < grid.shape[1] and grid[ni, nj] == EMPTY:
+                    # Move water left/right
+                    new_grid[ni, nj] = WATER
+                    new_grid[i + 1, j] = SAND
+                    moved = True
+                    break  # IF there is no option to move left/right -> Swap places with water
 
-                    # If there is no option to move left/right -> Swap places with water
-                    if not moved:
-                        new_grid[i, j] = WATER
-                        new_grid[i + 1, j] = SAND
+            # If there is no option to move left/right -> Swap places with water
+            if not moved:
+                new_grid[i, j] = WATER
+                new_grid[i + 1, j] = SAND
 
-                # 3. Check diagonal movement if it cannot move down
-                else:
-                    directions = [(1, -1), (1, 1)]
-                    np.random.shuffle(directions)
-
-                    for di, dj in directions:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < grid.shape[0] and 0 <= nj < grid.shape[1]:
-                            if grid[ni, nj] == EMPTY:
-                                new_grid[i, j] = EMPTY
-                                new_grid[ni, nj] = SAND
-                                break
-
-                    # 4. If there is no option to move, stay in place
-                    else:
-                        new_grid[i, j] = SAND
-
-            elif grid[i, j] == WOOD:
-
-                # 1. Check if wood is under water
-                current_i = i
-                while current_i > 0 and grid[current_i - 1, j] == WATER:
-                    new_grid[current_i - 1, j] = WOOD
-                    new_grid[current_i, j] = WATER
-                    water_amount[current_i, j] = min(water_amount[current_i, j] + 0.5, 1.0)
-                    # Update grid
-                    grid[current_i - 1, j] = WOOD
-                    grid[current_i, j] = WATER
-                    current_i -= 1
-
-                if current_i != i:
-                    continue
-
-                # Check if wood is trapped between 75% water cells
-                left_water = j > 0 and grid[i, j - 1] == WATER and water_amount[i, j - 1] >= 0.75
-                right_water = j < cols - 1 and grid[i, j + 1] == WATER and water_amount[i, j + 1] >= 0.75
-                above_empty = i > 0 and grid[i - 1, j] == EMPTY
-
-                if left_water and right_water and above_empty:
-                    new_grid[i - 1, j] = WOOD
-                    new_grid[i, j] = WATER
-                    water_amount[i, j] = min(water_amount[i, j] + 0.5, 1.0)
-                    continue
-
-                # 2. Fall down if there is space
-                if i < rows - 1 and grid[i + 1, j] == EMPTY:  # Check bottom boundary and empty space
-                    new_grid[i, j] = EMPTY
-                    new_grid[i + 1, j] = WOOD
-
-                elif i < rows - 1 and grid[i + 1, j] == WATER:  # Check bottom boundary and empty space
-                    new_grid[i, j] = WOOD # Wood stays in place
-
-                # 2. Check neighboring cells for fire with safe boundary checks up, down, left, right
-                elif (i > 0 and grid[i - 1, j] == FIRE) or \
-                        (i < rows - 1 and grid[i + 1, j] == FIRE) or \
-                        (j > 0 and grid[i, j - 1] == FIRE) or \
-                        (j < cols - 1 and grid[i, j + 1] == FIRE):
-                    new_grid[i, j] = FIRE
-
-            elif grid[i, j] == FIRE:
-                # 1. Fire moves downwards
-                if i < rows - 1:  # Check bottom boundary
-                    if grid[i + 1, j] == EMPTY:
-                        new_grid[i, j] = EMPTY
-                        new_grid[i + 1, j] = FIRE
-
-                    # 2. If flammable element (wood) is below → Dark smoke
-                    elif grid[i + 1, j] == WOOD:
-                        new_grid[i + 1, j] = FIRE  # Wood burns
-                        new_grid[i, j] = SMOKE_DARK  # Fire turns into dark smoke
-                        smoke_life[i, j] = 6 #Life span of smoke
-
-                    # 3. If it cannot move downwards → Light smoke
-                    else:
-                        new_grid[i, j] = SMOKE_LIGHT
-                        smoke_life[i, j] = 6
-
-            elif grid[i, j] in [SMOKE_DARK, SMOKE_LIGHT]:
-                # 1. Decrease smoke lifespan
-                smoke_life[i, j] -= 1
-                if smoke_life[i, j] <= 0:
-                    new_grid[i, j] = EMPTY  # Smoke disappears when lifespan reaches 0
-                    continue
-
-                # 2. Smoke tries to move upwards first in any direction (straight, left, right)
-                directions = [(-1, 0), (-1, -1), (-1, 1)]  # Up, up-left, up-right
-                np.random.shuffle(directions)  # Random direction choice
-                moved = False
-
-                for di, dj in directions:
-                    ni, nj = i + di, j + dj
-
-                   # Check boundary conditions
-                    if ni < 0 or ni >= rows or nj < 0 or nj >= cols:
-                        continue  # Avoid errors at grid edges
-
-                    # Check if the cell is empty, if so, move smoke
+        # 3. Check diagonal movement if it cannot move down
+        else:
+            directions = random_order([(1, -1), (1, 1)], rand[i, j])
+
+            for di, dj in directions:
+                ni, nj = i + di, j + dj
+                if 0 <= ni < grid.shape[0] and 0 <= nj < grid.shape[1]:
                     if grid[ni, nj] == EMPTY:
                         new_grid[i, j] = EMPTY
-                        new_grid[ni, nj] = grid[i, j]
-                        smoke_life[ni, nj] = smoke_life[i, j]
-                        moved = True
-                        break  # Smoke moves and stops checking
-
-                # 3. If smoke cannot move upwards → Move left or right
-                if not moved:
-                    if j > 0 and grid[i, j - 1] == EMPTY:  # Left EMPTY
-                        new_grid[i, j] = EMPTY
-                        new_grid[i, j - 1] = grid[i, j]
-                        smoke_life[i, j - 1] = smoke_life[i, j]
-                    elif j < cols - 1 and grid[i, j + 1] == EMPTY:  # Right EMPTY
-                        new_grid[i, j] = EMPTY
-                        new_grid[i, j + 1] = grid[i, j]
-                        smoke_life[i, j + 1] = smoke_life[i, j]
-
-            elif grid[i, j] == WATER:
-                # 1. Move down if there is empty space below
-                if i < rows - 1 and grid[i + 1, j] == EMPTY:
-                    transfer = min(water_amount[i, j], 1.0 - water_amount[i + 1, j]) # Transfer water only if there is space
-                    water_amount[i, j] -= transfer
-                    water_amount[i + 1, j] += transfer
-                    new_grid[i + 1, j] = WATER
-                    if water_amount[i, j] == 0: # If there is no water left, set the cell to empty
-                        new_grid[i, j] = EMPTY
+                        new_grid[ni, nj] = SAND
+                        break
 
-                # 2. Spread left and right if the cells below are full
-                if i < rows - 1 and (grid[i + 1, j] in [WALL, SAND, WOOD, WATER] ):
-                    for dx in [-1, 1]:  # Left, Right
-                        ni, nj = i, j + dx
-                        if 0 <= ni < rows and 0 <= nj < cols:
-                            # Check if the cell is empty or water and if there is enough water to transfer
-                            if grid[ni, nj] in [EMPTY, WATER] and water_amount[i, j] > 0.01:
-                                max_transfer = min(water_amount[i, j] * 0.5, 1.0 - water_amount[ni, nj])
-                                water_amount[ni, nj] += max_transfer
-                                water_amount[i, j] -= max_transfer
-                                new_grid[ni, nj] = WATER
-                                if water_amount[i, j] == 0: # If there is no water left, set the cell to empty
-                                    new_grid[i, j] = EMPTY
-
-                # 3. IF the ceels is bellow 0.01, set it to 0
-                if water_amount[i, j] <= 0.01:
-                    water_amount[i, j] = 0
-                    new_grid[i, j] = EMPTY
-
-                # 4. Move down if any neighboring cells below are not full (less than 100%)
-                if i < rows - 1 and grid[i + 1, j] in [WATER]: # Check if the cell below is water
-                    bottom_not_full = False
-                    for dx in [-1, 0, 1]:  # left, center, right
-                        ni, nj = i + 1, j + dx
-                        if 0 <= ni < rows and 0 <= nj < cols:
-                            if grid[ni, nj] == WATER and water_amount[ni, nj] < 1.0: # Check if the cell is full
-                                bottom_not_full = True # downstairs cell is not full
-                                break
-
-                    # if there is empty space below, move water down
-                    if bottom_not_full:
-                        transfer = min(water_amount[i, j], 1.0 - water_amount[i + 1, j])
-                        water_amount[i, j] -= transfer
-                        water_amount[i + 1, j] += transfer
-                        new_grid[i + 1, j] = WATER
-                        if water_amount[i, j] == 0:
+            # 4. If there is no option to move, stay in place
+            else:
+                new_grid[i, j] = SAND
+
+    elif grid[i, j] == WOOD:
+
+        # 1. Check if wood is under water
+        current_i = i
+        while current_i > 0 and grid[current_i - 1, j] == WATER:
+            new_grid[current_i - 1, j] = WOOD
+            new_grid[current_i, j] = WATER
+            water_amount[current_i, j] = min(water_amount[current_i, j] + 0.5, 1.0)
+            # Update grid
+            grid[current_i - 1, j] = WOOD
+            grid[current_i, j] = WATER
+            current_i -= 1
+
+        if current_i != i:
+            return
+
+        # Check if wood is trapped between 75% water cells
+        left_water = j > 0 and grid[i, j - 1] == WATER and water_amount[i, j - 1] >= 0.75
+        right_water = j < cols - 1 and grid[i, j + 1] == WATER and water_amount[i, j + 1] >= 0.75
+        above_empty = i > 0 and grid[i - 1, j] == EMPTY
+
+        if left_water and right_water and above_empty:
+            new_grid[i - 1, j] = WOOD
+            new_grid[i, j] = WATER
+            water_amount[i, j] = min(water_amount[i, j] + 0.5, 1.0)
+            return
+
+        # 2. Fall down if there is space
+        if i < rows - 1 and grid[i + 1, j] == EMPTY:  # Check bottom boundary and empty space
+            new_grid[i, j] = EMPTY
+            new_grid[i + 1, j] = WOOD
+
+        elif i < rows - 1 and grid[i + 1, j] == WATER:  # Check bottom boundary and empty space
+            new_grid[i, j] = WOOD # Wood stays in place
+
+        # 2. Check neighboring cells for fire with safe boundary checks up, down, left, right
+        elif (i > 0 and grid[i - 1, j] == FIRE) or \
+                (i < rows - 1 and grid[i + 1, j] == FIRE) or \
+                (j > 0 and grid[i, j - 1] == FIRE) or \
+                (j < cols - 1 and grid[i, j + 1] == FIRE):
+            new_grid[i, j] = FIRE
+
+    elif grid[i, j] == FIRE:
+        # 1. Fire moves downwards
+        if i < rows - 1:  # Check bottom boundary
+            if grid[i + 1, j] == EMPTY:
+                new_grid[i, j] = EMPTY
+                new_grid[i + 1, j] = FIRE
+
+            # 2. If flammable element (wood) is below → Dark smoke
+            elif grid[i + 1, j] == WOOD:
+                new_grid[i + 1, j] = FIRE  # Wood burns
+                new_grid[i, j] = SMOKE_DARK  # Fire turns into dark smoke
+                smoke_life[i, j] = 6 #Life span of smoke
+
+            # 3. If it cannot move downwards → Light smoke
+            else:
+                new_grid[i, j] = SMOKE_LIGHT
+                smoke_life[i, j] = 6
+
+    elif grid[i, j] in [SMOKE_DARK, SMOKE_LIGHT]:
+        # 1. Decrease smoke lifespan
+        if smoke_life[i, j] <= 1:  # Checked before decreasing, smoke_life can be unsigned
+            smoke_life[i, j] = 0
+            new_grid[i, j] = EMPTY  # Smoke disappears when lifespan reaches 0
+            return
+        smoke_life[i, j] -= 1
+
+        # 2. Smoke tries to move upwards first in any direction (straight, left, right)
+        directions = random_order([(-1, 0), (-1, -1), (-1, 1)], rand[i, j])  # Up, up-left, up-right in random order
+        moved = False
+
+        for di, dj in directions:
+            ni, nj = i + di, j + dj
+
+           # Check boundary conditions
+            if ni < 0 or ni >= rows or nj < 0 or nj >= cols:
+                continue  # Avoid errors at grid edges
+
+            # Check if the cell is empty, if so, move smoke
+            if grid[ni, nj] == EMPTY:
+                new_grid[i, j] = EMPTY
+                new_grid[ni, nj] = grid[i, j]
+                smoke_life[ni, nj] = smoke_life[i, j]
+                moved = True
+                break  # Smoke moves and stops checking
+
+        # 3. If smoke cannot move upwards → Move left or right
+        if not moved:
+            if j > 0 and grid[i, j - 1] == EMPTY:  # Left EMPTY
+                new_grid[i, j] = EMPTY
+                new_grid[i, j - 1] = grid[i, j]
+                smoke_life[i, j - 1] = smoke_life[i, j]
+            elif j < cols - 1 and grid[i, j + 1] == EMPTY:  # Right EMPTY
+                new_grid[i, j] = EMPTY
+                new_grid[i, j + 1] = grid[i, j]
+                smoke_life[i, j + 1] = smoke_life[i, j]
+
+    elif grid[i, j] == WATER:
+        # 1. Move down if there is empty space below
+        if i < rows - 1 and grid[i + 1, j] == EMPTY:
+            transfer = min(water_amount[i, j], 1.0 - water_amount[i + 1, j]) # Transfer water only if there is space
+            water_amount[i, j] -= transfer
+            water_amount[i + 1, j] += transfer
+            new_grid[i + 1, j] = WATER
+            if water_amount[i, j] == 0: # If there is no water left, set the cell to empty
+                new_grid[i, j] = EMPTY
+
+        # 2. Spread left and right if the cells below are full
+        if i < rows - 1 and (grid[i + 1, j] in [WALL, SAND, WOOD, WATER] ):
+            for dx in [-1, 1]:  # Left, Right
+                ni, nj = i, j + dx
+                if 0 <= ni < rows and 0 <= nj < cols:
+                    # Check if the cell is empty or water and if there is enough water to transfer
+                    if grid[ni, nj] in [EMPTY, WATER] and water_amount[i, j] > 0.01:
+                        max_transfer = min(water_amount[i, j] * 0.5, 1.0 - water_amount[ni, nj])
+                        water_amount[ni, nj] += max_transfer
+                        water_amount[i, j] -= max_transfer
+                        new_grid[ni, nj] = WATER
+                        if water_amount[i, j] == 0: # If there is no water left, set the cell to empty
                             new_grid[i, j] = EMPTY
 
-            elif grid[i, j] == ICE:
-                # 1. Ice melts if there is fire nearby
-                if (
-                        (i > 0 and grid[i - 1, j] == FIRE) or
-                        (i < rows - 1 and grid[i + 1, j] == FIRE) or
-                        (j > 0 and grid[i, j - 1] == FIRE) or
-                        (j < cols - 1 and grid[i, j + 1] == FIRE)
-                ):
-                    new_grid[i, j] = WATER
-                    water_amount[i, j] = 0.25
-                    continue
-
-                # 2. Ice moves down if there is empty space below
-                if i < rows - 1 and grid[i + 1, j] == EMPTY:
+        # 3. IF the ceels is bellow 0.01, set it to 0
+        if water_amount[i, j] <= 0.01:
+            water_amount[i, j] = 0
+            new_grid[i, j] = EMPTY
+
+        # 4. Move down if any neighboring cells below are not full (less than 100%)
+        if i < rows - 1 and grid[i + 1, j] in [WATER]: # Check if the cell below is water
+            bottom_not_full = False
+            for dx in [-1, 0, 1]:  # left, center, right
+                ni, nj = i + 1, j + dx
+                if 0 <= ni < rows and 0 <= nj < cols:
+                    if grid[ni, nj] == WATER and water_amount[ni, nj] < 1.0: # Check if the cell is full
+                        bottom_not_full = True # downstairs cell is not full
+                        break
+
+            # if there is empty space below, move water down
+            if bottom_not_full:
+                transfer = min(water_amount[i, j], 1.0 - water_amount[i + 1, j])
+                water_amount[i, j] -= transfer
+                water_amount[i + 1, j] += transfer
+                new_grid[i + 1, j] = WATER
+                if water_amount[i, j] == 0:
                     new_grid[i, j] = EMPTY
-                    new_grid[i + 1, j] = ICE
-                    continue
-
-                # 3. Ice spreads if the cells below are full
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:  # Levo, Desno, Gor, Dol
-                    ni, nj = i + dx, j + dy
-                    if 0 <= ni < rows and 0 <= nj < cols:
-                        if grid[ni, nj] == WATER:
-                            new_grid[ni, nj] = ICE
 
-    return new_grid
+    elif grid[i, j] == ICE:
+        # 1. Ice melts if there is fire nearby
+        if (
+                (i > 0 and grid[i - 1, j] == FIRE) or
+                (i < rows - 1 and grid[i + 1, j] == FIRE) or
+                (j > 0 and grid[i, j - 1] == FIRE) or
+                (j < cols - 1 and grid[i, j + 1] == FIRE)
+        ):
+            new_grid[i, j] = WATER
+            water_amount[i, j] = 0.25
+            return
+
+        # 2. Ice moves down if there is empty space below
+        if i < rows - 1 and grid[i + 1, j] == EMPTY:
+            new_grid[i, j] = EMPTY
+            new_grid[i + 1, j] = ICE
+            return
+
+        # 3. Ice spreads if the cells below are full
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:  # Levo, Desno, Gor, Dol
+            ni, nj = i + dx, j + dy
+            if 0 <= ni < rows and 0 <= nj < cols:
+                if grid[ni, nj] == WATER:
+                    new_grid[ni, nj] = ICE
+
+# Function for phase marks of step_fast when no profiler is set
+def ignore_phase(name):
+    pass
+
+TILE_SIZE = 16
+
+# Function for creating the active tile flags (all tiles start awake)
+def create_active_tiles(grid, tile_size=TILE_SIZE):
+    tile_rows = -(-grid.shape[0] // tile_size)
+    tile_cols = -(-grid.shape[1] // tile_size)
+    return np.ones((tile_rows, tile_cols), dtype=bool)
+
+# All per-cell fields of one simulation (structure of arrays) and the steppers that update them
+# Worlds share no state, so several can run at the same time (see step_worlds)
+class World:
+    __slots__ = ('grid', 'water_amount', 'smoke_life', 'rng', 'seed', 'generation', 'water_mass', 'profiler')
+
+    def __init__(self, grid, water_amount=None, smoke_life=None, rng=None, profiler=None, seed=None):
+        self.grid = grid  # Material of every cell
+        self.water_amount = np.zeros(grid.shape, dtype=WATER_DTYPE) if water_amount is None else water_amount
+        self.smoke_life = np.zeros(grid.shape, dtype=SMOKE_DTYPE) if smoke_life is None else smoke_life
+        self.rng = np.random if rng is None else rng  # np.random or a np.random.Generator
+        self.seed = seed  # Seed of the per-generation random streams (see step_rng), None = use rng
+        self.generation = 0
+        self.water_mass = None  # Total water after the last step_fast
+        self.profiler = profiler  # profiler.StepProfiler, None = no instrumentation
+
+    # Function for getting the random generator of the next step
+    # With a seed every generation draws from its own stream (seed, generation), so a run continued from a
+    # saved generation (see replay.py) makes the same choices as the uninterrupted run
+    def step_rng(self):
+        if self.seed is None:
+            return self.rng
+        return np.random.default_rng((self.seed, self.generation))
+
+    # Function for generating next generation
+    # backend: 'python' (update_cell loops), 'numba' (compiled kernel, same scan order, see kernels.py)
+    # or 'numpy' (step_fast)
+    def step(self, backend='python'):
+        if backend == 'numpy':
+            return self.step_fast()
+        if backend not in ('python', 'numba'):
+            raise ValueError(f"Unknown backend: {backend}")
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin(self, backend)
+        grid = self.grid
+        new_grid = np.copy(grid) # Copy the grid to avoid in-place changes
+        rows, cols = grid.shape
+        rand = self.step_rng().random(grid.shape)  # Random direction choices for every cell (one plane per step)
+
+        if backend == 'numba':
+            from kernels import get_kernel
+            get_kernel('sand')(grid, new_grid, self.water_amount, self.smoke_life, rand)
+            if profiler is not None:
+                profiler.lap('kernel')
+        elif profiler is not None:
+            cells = ((i, j) for i in range(rows-2, 0, -1) for j in range(1, cols-1))
+            profiler.update_cells(cells, grid, new_grid, self.water_amount, self.smoke_life, rand)
+        else:
+            for i in range(rows-2, 0, -1):
+                for j in range(1, cols-1):
+                    update_cell(grid, new_grid, self.water_amount, self.smoke_life, i, j, rand)
+
+        self.grid = new_grid
+        self.generation += 1
+        if profiler is not None:
+            profiler.end(self)
+        return new_grid
+
+    # Function for generating next generation only in active tiles
+    # Returns the new grid, active tiles for the next step and how many tiles were active
+    def step_active(self, active_tiles, tile_size=TILE_SIZE):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin(self, 'python')
+        grid, water_amount, smoke_life = self.grid, self.water_amount, self.smoke_life
+        old_grid = np.copy(grid)  # Wood under water changes grid in place
+        old_water = np.copy(water_amount)
+        old_smoke = np.copy(smoke_life)
+        new_grid = np.copy(grid)
+        rows, cols = grid.shape
+        rand = self.step_rng().random(grid.shape)  # Random direction choices for every cell (one plane per step)
+
+        # Same scan order as step, sleeping tiles are skipped
+        if profiler is not None:
+            cells = ((i, j) for i in range(rows-2, 0, -1) for tile_j in np.flatnonzero(active_tiles[i // tile_size])
+                     for j in range(max(tile_j * tile_size, 1), min((tile_j + 1) * tile_size, cols - 1)))
+            profiler.update_cells(cells, grid, new_grid, water_amount, smoke_life, rand)
+        else:
+            for i in range(rows-2, 0, -1):
+                for tile_j in np.flatnonzero(active_tiles[i // tile_size]):
+                    for j in range(max(tile_j * tile_size, 1), min((tile_j + 1) * tile_size, cols - 1)):
+                        update_cell(grid, new_grid, water_amount, smoke_life, i, j, rand)
+
+        # Tiles that changed stay awake and wake up their neighbors
+        changed = (new_grid != old_grid) | (water_amount != old_water) | (smoke_life != old_smoke)
+        tile_rows, tile_cols = active_tiles.shape
+        changed = np.pad(changed, ((0, tile_rows * tile_size - rows), (0, tile_cols * tile_size - cols)))
+        changed_tiles = changed.reshape(tile_rows, tile_size, tile_cols, tile_size).any(axis=(1, 3))
+
+        padded = np.pad(changed_tiles, 1)
+        next_active = np.zeros_like(active_tiles)
+        for di in range(3):
+            for dj in range(3):
+                next_active |= padded[di:di + tile_rows, dj:dj + tile_cols]
+
+        self.grid = new_grid
+        self.generation += 1
+        if profiler is not None:
+            profiler.lap('setup')  # Finding the changed tiles
+            profiler.end(self)
+        return new_grid, next_active, int(active_tiles.sum())
+
+    # Function for generating next generation with whole-grid masks, one material phase at a time
+    def step_fast(self):
+        if self.profiler is not None:
+            self.profiler.begin(self, 'numpy')
+        lap = ignore_phase if self.profiler is None else self.profiler.lap  # End of a numbered section
+        grid, water_amount, smoke_life, rng = self.grid, self.water_amount, self.smoke_life, self.step_rng()
+        new_grid = np.copy(grid)
+        moved = np.zeros(grid.shape, dtype=bool)
+        inner = np.zeros(grid.shape, dtype=bool)
+        inner[1:-1, 1:-1] = True  # The outer ring is not updated
+
+        flat_grid, flat_water, flat_moved = new_grid.reshape(-1), water_amount.reshape(-1), moved.reshape(-1)
+        flat_smoke = smoke_life.reshape(-1)
+        up, down, left, right = -grid.shape[1], grid.shape[1], -1, 1
+
+        def cells(*materials):  # Flat indices of inner cells that have not moved yet
+            return np.flatnonzero(is_material(new_grid, materials) & inner & ~moved)
+
+        def unmoved(idx):
+            return idx[~flat_moved[idx]]
+
+        def swap(idx, offset):
+            swap_cells(new_grid, water_amount, smoke_life, moved, idx, offset)
+
+        def neighbors(idx, offset, *materials):
+            return with_neighbor(new_grid, moved, idx, offset, materials)
+
+        lap('setup')
+
+        # 1. Sand falls into empty space
+        sand = cells(SAND)
+        swap(neighbors(sand, down, EMPTY), down)
+
+        # 2. Sand displaces water below: water moves left/right, otherwise they swap places
+        sinking = neighbors(unmoved(sand), down, WATER)
+        left_first = rng.random(len(sinking)) < 0.5
+        for first in (True, False):
+            for side in (left, right):
+                src = unmoved(sinking[left_first == ((side == left) == first)])
+                src = neighbors(neighbors(src, down, WATER), down + side, EMPTY)
+                swap(src + down, side)  # Water to the side
+                swap(src, down)  # Sand into the emptied cell
+        swap(neighbors(unmoved(sinking), down, WATER), down)
+
+        # 3. Sand on top of a pile slides diagonally
+        sliding = neighbors(unmoved(sand), down, SAND, FIRE, SMOKE_DARK, SMOKE_LIGHT, ICE)
+        random_moves(new_grid, water_amount, smoke_life, moved, sliding, [down + left, down + right], rng)
+        lap('sand')
+
+        # 4. Wood floats up through water, falls into empty space
+        wood = cells(WOOD)
+        swap(neighbors(wood, up, WATER), up)
+        swap(neighbors(unmoved(wood), down, EMPTY), down)
+        lap('wood')
+
+        # 5. Smoke ages and rises (up, up-left, up-right in random order), otherwise moves left or right
+        smoke = cells(SMOKE_DARK, SMOKE_LIGHT)
+        flat_smoke[smoke] = np.maximum(flat_smoke[smoke], 1) - 1  # Never below 0, smoke_life can be unsigned
+        flat_grid[smoke[flat_smoke[smoke] <= 0]] = EMPTY
+        smoke = smoke[flat_smoke[smoke] > 0]
+        random_moves(new_grid, water_amount, smoke_life, moved, smoke, [up, up + left, up + right], rng)
+        for side in (left, right):
+            swap(neighbors(unmoved(smoke), side, EMPTY), side)
+        lap('smoke')
+
+        # 6. Fire falls, burns wood below into dark smoke, otherwise turns into light smoke
+        fire_mask = grid.reshape(-1) == FIRE  # Fire at the start of the generation
+
+        def near_fire(idx):
+            return fire_mask[idx + up] | fire_mask[idx + down] | fire_mask[idx + left] | fire_mask[idx + right]
+
+        fire = cells(FIRE)
+        swap(neighbors(fire, down, EMPTY), down)
+        fire = unmoved(fire)
+        burning = neighbors(fire, down, WOOD)
+        flat_grid[fire] = SMOKE_LIGHT
+        flat_grid[burning] = SMOKE_DARK
+        flat_grid[burning + down] = FIRE  # Wood burns
+        flat_smoke[fire] = 6  # Life span of smoke
+        flat_moved[fire] = flat_moved[burning + down] = True
+
+        # Wood next to fire catches fire (unless it is falling or floating)
+        wood = cells(WOOD)
+        igniting = wood[near_fire(wood) & ~is_material(grid.reshape(-1)[wood + down], (EMPTY, WATER))]
+        flat_grid[igniting] = FIRE
+        flat_moved[igniting] = True
+        lap('fire')
+
+        # 7. Ice melts next to fire, falls into empty space, otherwise freezes water around it
+        ice = cells(ICE)
+        melting = ice[near_fire(ice)]
+        flat_grid[melting] = WATER
+        flat_water[melting] = 0.25
+        flat_moved[melting] = True
+        ice = unmoved(ice)
+        swap(neighbors(ice, down, EMPTY), down)
+        ice = unmoved(ice)
+        for offset in (up, down, left, right):
+            flat_grid[neighbors(ice, offset, WATER) + offset] = ICE
+        lap('ice')
+
+        # 8. Water flows as a mass field (see flow_water)
+        self.water_mass = flow_water(new_grid, water_amount)
+        lap('water')
+
+        self.grid = new_grid
+        self.generation += 1
+        if self.profiler is not None:
+            self.profiler.end(self)
+        return new_grid
+
+
+# Function for getting the module-level world of a grid (for the grid-only functions below)
+def module_world(grid, water_amount):
+    global smoke_life
+    if smoke_life is None or smoke_life.shape != grid.shape:
+        smoke_life = np.zeros_like(grid, dtype=SMOKE_DTYPE)
 
-# Function to draw the grid with textures
-def draw_grid(grid):
-    img = np.zeros((grid.shape[0] * 32, grid.shape[1] * 32, 3), dtype=np.uint8)
-    # Loop through the grid and draw the textures
-    for i in range(grid.shape[0]):
-        for j in range(grid.shape[1]):
-            if grid[i, j] == WATER:
-                water_level = water_amount[i, j]
-                if water_level <= 0.25:
-                    cell_texture = textures[WATER][0]
-                elif water_level <= 0.5:
-                    cell_texture = textures[WATER][1]
-                elif water_level <= 0.75:
-                    cell_texture = textures[WATER][2]
+    if water_amount is None or water_amount.shape != grid.shape:
+        water_amount = np.zeros_like(grid, dtype=WATER_DTYPE)
+    return World(grid, water_amount, smoke_life, profiler=profiler)
+
+# Function for generating next generation (World.step on the module-level world)
+def generate_next_gen(grid, steps, water_amount, backend='python'):
+    return module_world(grid, water_amount).step(backend)
+
+# Function for generating next generation only in active tiles (World.step_active on the module-level world)
+def generate_next_gen_active(grid, steps, water_amount, active_tiles, tile_size=TILE_SIZE):
+    return module_world(grid, water_amount).step_active(active_tiles, tile_size)
+
+# Function for stepping many worlds at the same time on a thread pool
+# The Numba kernels release the GIL, so with backend 'numba' the worlds really run in parallel;
+# give every world its own rng (np.random.default_rng) to keep the results reproducible
+def step_worlds(worlds, steps=1, backend='numba', workers=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run(world):
+        for _ in range(steps):
+            world.step(backend)
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(run, worlds))
+
+# Function for getting mask[i + di, j + dj] for every cell (False outside the grid)
+def neighbor(mask, di, dj):
+    rows, cols = mask.shape
+    out = np.zeros_like(mask)
+    out[max(-di, 0):rows - max(di, 0), max(-dj, 0):cols - max(dj, 0)] = \
+        mask[max(di, 0):rows - max(-di, 0), max(dj, 0):cols - max(-dj, 0)]
+    return out
+
+# Function for getting the mask of cells made of any of the materials
+def is_material(grid, materials):
+    if len(materials) == 1:
+        return grid == materials[0]
+    lookup = np.zeros(ICE + 1, dtype=bool)
+    lookup[list(materials)] = True
+    return lookup[grid]
+
+# Function for swapping cells (flat indices) with their neighbor at flat offset in all fields
+def swap_cells(grid, water_amount, smoke_life, moved, idx, offset):
+    target = idx + offset
+    for field in (grid, water_amount, smoke_life):
+        flat = field.reshape(-1)
+        flat[idx], flat[target] = flat[target], flat[idx]
+    moved.reshape(-1)[idx] = moved.reshape(-1)[target] = True  # Each particle moves once per generation
+
+# Function for keeping only cells whose neighbor at offset is one of the materials and has not moved yet
+def with_neighbor(grid, moved, idx, offset, materials):
+    target = idx + offset
+    return idx[~moved.reshape(-1)[target] & is_material(grid.reshape(-1)[target], materials)]
+
+# Function for moving cells into empty neighbors, trying the offsets in a random order per cell
+# Within one pass all cells move by the same offset, so two particles never get the same target
+def random_moves(grid, water_amount, smoke_life, moved, idx, offsets, rng):
+    can_move = np.zeros(len(idx), dtype=bool)
+    for offset in offsets:
+        can_move |= (grid.reshape(-1)[idx + offset] == EMPTY) & ~moved.reshape(-1)[idx + offset]
+    idx = idx[can_move]  # Most particles are stuck, skip them early
+
+    orders = np.array(list(permutations(range(len(offsets)))), dtype=np.int8)
+    order = orders[(rng.random(len(idx)) * len(orders)).astype(int)]  # Random order for every cell
+    for rank in range(len(offsets)):
+        for k, offset in enumerate(offsets):
+            chosen = idx[(order[:, rank] == k) & ~moved.reshape(-1)[idx]]
+            swap_cells(grid, water_amount, smoke_life, moved, with_neighbor(grid, moved, chosen, offset, (EMPTY,)), offset)
+
+MAX_WATER = 1.0  # Water in a full cell
+MAX_COMPRESS = 0.02  # Extra water a cell holds for every full cell above it
+MIN_WATER = 0.01  # Cells with less water are shown as empty (the water is kept)
+
+water_mass = None  # Total water after the last generate_next_gen_fast (module-level world)
+
+# Function for computing how much of the water of two stacked cells belongs to the bottom one
+def stable_bottom(total):
+    return np.where(total <= MAX_WATER, MAX_WATER,
+                    np.where(total < 2 * MAX_WATER + MAX_COMPRESS,
+                             (MAX_WATER ** 2 + total * MAX_COMPRESS) / (MAX_WATER + MAX_COMPRESS),
+                             (total + MAX_COMPRESS) / 2))
+
+# Function for moving water between EMPTY/WATER cells as flux arrays, returns the total water
+# Every flow is taken from one cell and added to another, so the total only changes by rounding
+def flow_water(grid, water_amount, iterations=1):
+    inner = np.zeros(grid.shape, dtype=bool)
+    inner[1:-1, 1:-1] = True  # The outer ring is not updated
+    flat_grid, flat_water = grid.reshape(-1), water_amount.reshape(-1)
+    cols = grid.shape[1]
+
+    for _ in range(iterations):
+        fluid = (is_material(grid, (EMPTY, WATER)) & inner).reshape(-1)
+        src = np.flatnonzero(fluid & ((flat_water > 0) | (flat_grid == WATER)))  # Cells that hold water
+        remaining = flat_water[src].copy()
+        flows = []
+
+        # 1. Down, 2. left and right (from the same amount, so neither side is preferred), 3. up
+        for offsets in ([cols], [-1, 1], [-cols]):
+            share = remaining / len(offsets)
+            for offset in offsets:
+                target = src + offset
+                target_mass = np.where(fluid[target], flat_water[target], 0.0)
+                if offset == cols:
+                    flow = stable_bottom(remaining + target_mass) - target_mass
+                elif offset == -cols:
+                    flow = remaining - stable_bottom(remaining + target_mass)
                 else:
-                    cell_texture = textures[WATER][3]
-                img[i * 32:(i + 1) * 32, j * 32:(j + 1) * 32] = cell_texture
-
-            else:
-                img[i * 32:(i + 1) * 32, j * 32:(j + 1) * 32] = textures[grid[i, j]]
+                    flow = (remaining - target_mass) / 4
+                flows.append((target, np.clip(flow, 0.0, share) * fluid[target]))
+            for _, flow in flows[-len(offsets):]:
+                remaining -= flow
+
+        flat_water[src] = remaining
+        for target, flow in flows:
+            flat_water[target] += flow  # Targets are unique for one direction
+        changed = np.concatenate([src] + [target[fluid[target]] for target, _ in flows])  # Never walls or solids
+        flat_grid[changed] = np.where(flat_water[changed] >= MIN_WATER, WATER, EMPTY)
+
+    return float(water_amount.sum())
+
+
+# Function for generating next generation with whole-grid masks (World.step_fast on the module-level world)
+def generate_next_gen_fast(grid, steps, water_amount, rng=None):
+    global water_mass
+    world = module_world(grid, water_amount)
+    if rng is not None:
+        world.rng = rng
+    new_grid = world.step_fast()
+    water_mass = world.water_mass
+    return new_grid
 
-    return img
+TILE_PX = 32  # Size of a texture in pixels
+WATER_TILES = [WATER, ICE + 1, ICE + 2, ICE + 3]  # Atlas index for 1/4, 1/2, 3/4 and full water
+atlases = {}  # Pixels per cell -> atlas rows (see get_atlas)
+frame_buffers = threading.local()  # .frame: frame reused by render_grid, one per thread, freed with the thread
+RENDER_BAND_CELLS = 1 << 16  # Cells gathered by one np.take in render_grid
+
+# Function for getting the cache file of the decoded textures, named by the size and mtime of every PNG
+def tiles_cache_path():
+    key = hashlib.sha1()
+    for name in TILE_FILES:
+        info = os.stat(os.path.join(TILES_DIR, name))
+        key.update(f"{name}:{info.st_size}:{info.st_mtime_ns};".encode())
+    return os.path.join(os.path.dirname(TILES_DIR), f"tiles_atlas_{key.hexdigest()[:16]}.npy")
+
+# Function for loading the textures once per process
+# The decoded PNGs are cached as .npy next to tiles/ and memory-mapped, PIL is only needed when a PNG changed
+def load_tiles():
+    global tiles
+    if tiles is not None:
+        return tiles
+    path = tiles_cache_path()
+    if not os.path.exists(path):
+        from PIL import Image
+        decoded = np.stack([np.array(Image.open(os.path.join(TILES_DIR, name)).convert("RGB")) for name in TILE_FILES])
+        temp = f"{path}.{os.getpid()}.tmp.npy"  # Own temp file, processes starting at once do not clobber it
+        try:
+            np.save(temp, decoded)
+            os.replace(temp, path)  # Other processes never see a half-written cache
+            for name in os.listdir(os.path.dirname(path)):  # Remove caches of older textures
+                old = os.path.join(os.path.dirname(path), name)
+                if name.startswith("tiles_atlas_") and name.endswith(".npy") and not name.endswith(".tmp.npy") \
+                        and old != path:
+                    try:
+                        os.remove(old)
+                    except FileNotFoundError:
+                        pass  # Removed by another process at the same time
+        except OSError:
+            tiles = decoded  # Read-only checkout, work without the cache
+            return tiles
+    tiles = np.load(path, mmap_mode='r')
+    return tiles
+
+# Function for stacking all textures into one atlas, downscaled to scale x scale pixels per tile
+# Returned as rows: row y * n_tiles + t is pixel row y of tile t
+def get_atlas(scale=TILE_PX):
+    if TILE_PX % scale:
+        raise ValueError(f"Scale must divide {TILE_PX}: {scale}")
+    if scale not in atlases:
+        atlas = np.asarray(load_tiles())
+        if scale != TILE_PX:
+            block = TILE_PX // scale
+            atlas = atlas.reshape(len(atlas), scale, block, scale, block, 3).mean(axis=(2, 4)).astype(np.uint8)
+        atlases[scale] = np.ascontiguousarray(atlas.transpose(1, 0, 2, 3)).reshape(scale * len(atlas), scale * 3)
+    return atlases[scale]
+
+# Function for mapping every cell to its atlas index (water by its level), uint8 like the grid (12 tiles)
+def tile_indices(grid, water):
+    tiles = grid.astype(np.uint8)
+    water_cells = grid == WATER
+    levels = np.searchsorted([0.25, 0.5, 0.75], water[water_cells])  # <= 0.25 -> 0, ..., > 0.75 -> 3
+    tiles[water_cells] = np.array(WATER_TILES, dtype=np.uint8)[levels]
+    return tiles
+
+# Function for rendering the grid from the atlas, one gather per pixel row of the tiles
+# The frame buffer of the thread is reused by the next call with the same size (matplotlib copies it in set_data)
+# and replaced when the size changes, so a thread keeps at most one frame
+def render_grid(grid, water, scale=TILE_PX):
+    rows, cols = grid.shape
+    atlas_rows = get_atlas(scale)
+    n_tiles = len(atlas_rows) // scale
+
+    frame = getattr(frame_buffers, 'frame', None)  # One buffer per thread, worlds can render concurrently
+    if frame is None or frame.shape != (rows * scale, cols * scale, 3):
+        frame = frame_buffers.frame = np.empty((rows * scale, cols * scale, 3), dtype=np.uint8)
+
+    # frame[r * scale + y, c * scale:(c + 1) * scale] = pixel row y of the tile of cell (r, c)
+    # Gathered in bands of grid rows, so the index array np.take makes from the uint8 tiles stays small
+    tiles = tile_indices(grid, water)
+    pixel_rows = frame.reshape(rows, scale, cols, scale * 3)
+    band = max(RENDER_BAND_CELLS // cols, 1)
+    for r in range(0, rows, band):
+        for y in range(scale):
+            np.take(atlas_rows[y * n_tiles:(y + 1) * n_tiles], tiles[r:r + band], axis=0,
+                    out=pixel_rows[r:r + band, y], mode='clip')
+    return frame
+
+# Function for getting the water levels to draw (module water_amount)
+def water_to_draw(grid):
+    if water_amount is not None and water_amount.shape == grid.shape:
+        return water_amount
+    return np.zeros(grid.shape)
+
+# Function to draw the grid with textures (scale: pixels per cell, 1 or 4 for large grids)
+def draw_grid(grid, scale=TILE_PX):
+    return render_grid(grid, water_to_draw(grid), scale)
+
+# Renderer that keeps one frame and redraws only the cells whose tile changed
+class DirtyRenderer:
+    def __init__(self, frame=None, scale=TILE_PX):
+        self.frame = frame  # Persistent image, can be the array shown by matplotlib
+        self.scale = scale
+        self.tiles = None  # Atlas index of every cell currently in the frame
+
+    # Function for drawing the changed cells into the frame, returns how many cells were drawn
+    def render(self, grid, water):
+        rows, cols = grid.shape
+        scale = self.scale
+        tiles = tile_indices(grid, water)
+        if self.frame is None:
+            self.frame = np.empty((rows * scale, cols * scale, 3), dtype=np.uint8)
+        if not self.frame.flags.c_contiguous:
+            raise ValueError("Frame must be C-contiguous")
+
+        if self.tiles is None or self.tiles.shape != tiles.shape:
+            r, c = np.indices(tiles.shape).reshape(2, -1)  # First frame: draw everything
+        else:
+            r, c = np.nonzero(tiles != self.tiles)
+
+        atlas_rows = get_atlas(scale)
+        tile_pixels = atlas_rows.reshape(scale, -1, scale * 3).transpose(1, 0, 2)  # (tile, y, x * 3)
+        self.frame.reshape(rows, scale, cols, scale * 3)[r, :, c, :] = tile_pixels[tiles[r, c]]
+        self.tiles = tiles
+        return len(r)
+
+    # Function for drawing into the array of a matplotlib image (no copy in set_data)
+    def attach(self, img):
+        self.frame = np.ma.getdata(img.get_array())
+
+# Function for animating a world
+# With a DirtyRenderer only the changed cells are drawn into the image (use with blit=True)
+# With a detector (cycles.CycleDetector over grid, water and smoke) the run is checked for a fixed point or cycle,
+# animate with frames=detector.frames(steps) to stop there
+# With a hud (matplotlib Text) and world.profiler set, the text shows the phase times of the last step
+def animate_world(frame_num, world, img, active_tiles=None, renderer=None, detector=None, hud=None):
+    if active_tiles is None:
+        world.step()
+    else:
+        _, active_tiles[:], _ = world.step_active(active_tiles)
+
+    if renderer is None:
+        img.set_data(render_grid(world.grid, world.water_amount))
+    else:
+        if renderer.frame is None:
+            renderer.attach(img)
+        if renderer.render(world.grid, world.water_amount):
+            img.stale = True
+
+    if detector is not None and detector.update([world.grid, world.water_amount, world.smoke_life]):
+        print(detector.describe())
+    if hud is not None and world.profiler is not None:
+        hud.set_text(world.profiler.hud())
+        return img, hud
+    return img,
 
-# Function for animating the simulation
-def animate(frame_num, grid, img, steps, water_amount):
-    new_grid = generate_next_gen(grid, steps, water_amount)
-    img.set_data(draw_grid(new_grid))
-    grid[:] = new_grid
+# Function for animating the simulation (animate_world on the module-level world, grid is updated in place)
+def animate(frame_num, grid, img, steps, water_amount, active_tiles=None, renderer=None, detector=None):
+    world = module_world(grid, water_amount)
+    animate_world(frame_num, world, img, active_tiles, renderer, detector)
+    grid[:] = world.grid
     return img,
 
-def create_test_environment(size):
-    global smoke_life, water_amount
-    grid = np.full((size, size), EMPTY)
+# Function for creating the test world
+def create_test_world(size, seed=None):
+    grid = np.full((size, size), EMPTY, dtype=CELL_DTYPE)
 
     grid[5, 4:7] = SAND
     grid[6, 4:7] = SAND
@@ -350,8 +840,8 @@ def create_test_environment(size):
     grid[8, 0:3] = WALL
     grid[11, 6:9] = WALL
 
-    smoke_life = np.zeros((size, size), dtype=int)
-    water_amount = np.zeros((size, size), dtype=float)
+    smoke_life = np.zeros((size, size), dtype=SMOKE_DTYPE)
+    water_amount = np.zeros((size, size), dtype=WATER_DTYPE)
 
     smoke_life[12, 5] = 20
     smoke_life[12, 6] = 15
@@ -365,6 +855,11 @@ def create_test_environment(size):
     water_amount[7, 5] = 0.5
     water_amount[8, 5] = 0.25
 
-    return grid
-
+    return World(grid, water_amount, smoke_life, seed=seed)
 
+# Function for creating the test environment (the other fields go to the module-level world)
+def create_test_environment(size):
+    global smoke_life, water_amount
+    world = create_test_world(size)
+    smoke_life, water_amount = world.smoke_life, world.water_amount
+    return world.grid
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Throughput of the steppers and renderers over grid sizes.
+# Every case is timed on a scene created with a fixed seed; the result is the median time of one call,
+# reported as cells/second, together with the peak memory allocated by one call (tracemalloc).
+# Results are saved as JSON, --compare reports cases that got slower between two result files.
+
+SIZES = (20, 64, 256, 1024, 2048)
+BACKENDS = ('python', 'numpy', 'numba')
+MAX_FRAME = 4096  # Largest rendered frame side in pixels, bigger grids are drawn with fewer pixels per cell
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function for the 1D stepper: a single alive cell in the middle of the row, rule 30
+def case_1d(size, backend, seed):
+    from one import get_rule_binary, generate_next_gen_1d
+    rule_binary = get_rule_binary(30)
+    state = [np.zeros(size * size, dtype=int)]  # size x size cells, as many as the 2D cases
+    state[0][len(state[0]) // 2] = 1
+
+    def run():
+        state[0] = generate_next_gen_1d(state[0], rule_binary, backend)
+    return run, None
+
+
+# Function for the 2D stepper on a random grid
+def case_2d(size, backend, seed):
+    from two import create_initial_state_2d, generate_next_gen_2d
+    np.random.seed(seed)
+    state = [create_initial_state_2d(size, fill_ratio=0.40)]
+
+    def run():
+        state[0] = generate_next_gen_2d(state[0], backend)
+    return run, None
+
+
+# Function for the sand stepper on one of the avatar scenes ('initial' or 'test')
+# The scene is a World with all its fields (water levels, smoke life), stepped like generate_next_gen does
+def case_sand(scene, size, backend, seed):
+    import avatar
+    create = avatar.create_initial_world if scene == 'initial' else avatar.create_test_world
+    world = create(size, seed)
+    return lambda: world.step(backend), None
+
+
+# Function for the pixels per cell used to draw a grid of the given size
+def render_scale(size):
+    scale = 32
+    while scale > 1 and size * scale > MAX_FRAME:
+        scale //= 2
+    return scale
+
+
+# Function for avatar.draw_grid (full frame every call) on the test scene
+def case_draw_avatar(size, backend, seed):
+    import avatar
+    np.random.seed(seed)
+    grid = avatar.create_test_environment(size)
+    scale = render_scale(size)
+    return lambda: avatar.draw_grid(grid, scale), None
+
+
+# Function for interative.draw_grid (only changed cells) after one numpy step of the test scene
+# The step is published to the editor's buffers directly, the simulation thread is not started
+def case_draw_interactive(size, backend, seed):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    import avatar
+    import interative
+    np.random.seed(seed)
+    editor = interative.Editor(avatar.create_test_world(size))
+    editor.world.rng = np.random.default_rng(seed)
+    fig, ax = plt.subplots()
+    interative.draw_grid(editor, ax, size)  # First call creates the image
+
+    def prepare():
+        editor.world.step('numpy')
+        editor.simulation.publish()
+    return lambda: interative.draw_grid(editor, ax, size), prepare
+
+
+# name -> (function, backends, fixed pixels per cell (None = any size))
+CASES = {
+    'one.generate_next_gen_1d': (case_1d, BACKENDS, None),
+    'two.generate_next_gen_2d': (case_2d, BACKENDS, None),
+    'avatar.generate_next_gen[initial]': (lambda *args: case_sand('initial', *args), BACKENDS, None),
+    'avatar.generate_next_gen[test]': (lambda *args: case_sand('test', *args), BACKENDS, None),
+    'avatar.draw_grid': (case_draw_avatar, (None,), None),
+    'interative.draw_grid': (case_draw_interactive, (None,), 32),
+}
+
+
+# Function for timing calls until min_time has passed, returns the median time of one call and the number of calls
+def time_calls(run, prepare=None, min_time=0.5, max_calls=50):
+    times = []
+    while sum(times) < min_time and len(times) < max_calls:
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(times)
+
+
+# Function for the peak memory allocated by one call in bytes
+def peak_memory(run, prepare=None):
+    if prepare is not None:
+        prepare()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Function for running all cases, a case is skipped once its projected time for one call exceeds max_seconds
+def run_benchmarks(names=None, sizes=SIZES, backends=BACKENDS, seed=0, min_time=0.5, max_seconds=5.0):
+    results = []
+    for name, (make_case, case_backends, fixed_scale) in CASES.items():
+        if names and name not in names:
+            continue
+        for backend in case_backends:
+            if backend is not None and backend not in backends:
+                continue
+            rate = None  # Cells/second at the previous size
+            for size in sizes:
+                cells = size * size
+                label = f"{name} [{backend or '-'}] {size}x{size}"
+                if fixed_scale and (size * fixed_scale) > MAX_FRAME:
+                    reason = 'prevelika slika'
+                elif rate is not None and cells / rate > max_seconds:
+                    reason = f'ocena {cells / rate:.1f} s na klic'
+                else:
+                    reason = None
+                if reason is not None:
+                    print(f"{label:58s} preskočeno ({reason})")
+                    results.append({'name': name, 'backend': backend, 'size': size, 'skipped': reason})
+                    continue
+
+                run, prepare = make_case(size, backend, seed)
+                if backend == 'numba':
+                    run()  # Compile (or load from cache) outside the timing
+                seconds, calls = time_calls(run, prepare, min_time)
+                memory = peak_memory(run, prepare)
+                rate = cells / seconds
+                print(f"{label:58s} {rate:14,.0f} celic/s  {seconds * 1000:10.3f} ms  {memory / 2**20:8.2f} MiB")
+                results.append({'name': name, 'backend': backend, 'size': size, 'cells': cells, 'calls': calls,
+                                'seconds': seconds, 'cells_per_second': rate, 'peak_bytes': memory})
+    return results
+
+
+# Function for describing where the results were measured
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+# Function for comparing two result files, returns the cases that are slower by more than threshold
+def compare_results(old_path, new_path, threshold=0.1):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_rates = {(r['name'], r['backend'], r['size']): r['cells_per_second']
+                 for r in old['results'] if 'skipped' not in r}
+
+    regressions = []
+    for result in new['results']:
+        key = (result['name'], result['backend'], result['size'])
+        if 'skipped' in result or key not in old_rates:
+            continue
+        change = result['cells_per_second'] / old_rates[key] - 1
+        label = f"{key[0]} [{key[1] or '-'}] {key[2]}x{key[2]}"
+        print(f"{label:58s} {change:+8.1%}" + ("  POČASNEJE" if change < -threshold else ""))
+        if change < -threshold:
+            regressions.append((key, change))
+    print(f"{old['environment']['commit']} -> {new['environment']['commit']}: "
+          f"{len(regressions)} počasnejših primerov (prag {threshold:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merjenje prepustnosti korakov in izrisa")
+    parser.add_argument("--sizes", type=lambda text: [int(s) for s in text.split(',')], default=list(SIZES))
+    parser.add_argument("--backends", type=lambda text: text.split(','), default=list(BACKENDS))
+    parser.add_argument("--case", action="append", choices=list(CASES), help="samo izbrani primeri (lahko večkrat)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="najmanjši čas merjenja primera v sekundah")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="preskoči primere, daljše od tega na klic")
+    parser.add_argument("-o", "--output", help="izhodna datoteka JSON (privzeto benchmark_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("STARO", "NOVO"), help="primerjaj dve datoteki z rezultati")
+    parser.add_argument("--threshold", type=float, default=0.1, help="dovoljena upočasnitev pri --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare_results(*args.compare, args.threshold) else 0)
+
+    info = environment()
+    results = run_benchmarks(args.case, args.sizes, args.backends, args.seed, args.min_time, args.max_seconds)
+    output = args.output or f"benchmark_{info['commit'] or 'local'}.json"
+    with open(output, 'w') as f:
+        json.dump({'environment': info, 'seed': args.seed, 'results': results}, f, indent=2)
+    print(f"Rezultati shranjeni v {output}")
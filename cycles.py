@@ -0,0 +1,82 @@
+import numpy as np
+
+# Cycle and fixed-point detection by hashing every state of a run.
+# The hash is Zobrist-like: XOR of one 64-bit value per (cell, value) pair, so after a step only the
+# changed cells are re-hashed. A bounded hash -> generation table finds cycles of any period.
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Function for mixing 64-bit values (splitmix64 finalizer, uint64 arithmetic wraps around)
+def mix(x):
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# Function for getting the raw bits of cell values as uint64 (floats by their bit pattern)
+def value_bits(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = values.view(f'u{values.dtype.itemsize}')
+    return values.astype(np.uint64)
+
+
+class CycleDetector:
+    # fields: arrays that together form the state (e.g. grid, water_amount, smoke_life)
+    def __init__(self, fields, max_entries=100_000, seed=0):
+        rng = np.random.default_rng(seed)
+        self.keys = [rng.integers(0, 2 ** 63, size=np.shape(field), dtype=np.uint64) for field in fields]
+        self.last = [np.array(field) for field in fields]  # Previous state, to find the changed cells
+        self.max_entries = max_entries
+        self.evicted = False  # Table overflowed, transient may be overestimated
+
+        self.hash = np.uint64(0)
+        for keys, field in zip(self.keys, self.last):
+            self.hash ^= np.bitwise_xor.reduce(self.cell_hash(keys, field), axis=None)
+        self.generation = 0
+        self.seen = {int(self.hash): 0}  # State hash -> generation it was first seen
+        self.transient = None  # Generations before the cycle starts
+        self.period = None  # Length of the cycle (1 = fixed point)
+
+    # Function for hashing cells: one value per (cell, value) pair
+    def cell_hash(self, keys, values):
+        return mix(keys ^ (value_bits(values) * GOLDEN))
+
+    # Function for adding the next state, returns True once a cycle has been found
+    def update(self, fields):
+        for keys, last, field in zip(self.keys, self.last, fields):
+            changed = np.flatnonzero(last != field)
+            if len(changed):
+                old, new = last.flat[changed], np.asarray(field).flat[changed].astype(last.dtype)
+                self.hash ^= np.bitwise_xor.reduce(self.cell_hash(keys.flat[changed], old) ^
+                                                   self.cell_hash(keys.flat[changed], new))
+                last.flat[changed] = new
+        self.generation += 1
+
+        key = int(self.hash)
+        first = self.seen.get(key)
+        if first is not None:
+            self.transient, self.period = first, self.generation - first
+            return True
+        if len(self.seen) >= self.max_entries:
+            del self.seen[next(iter(self.seen))]  # Forget the oldest state
+            self.evicted = True
+        self.seen[key] = self.generation
+        return False
+
+    # Function for animation frames that end once a cycle has been found (FuncAnimation frames=...)
+    def frames(self, steps):
+        for frame in range(steps):
+            if self.period is not None:
+                return
+            yield frame
+
+    # Function for describing the found cycle
+    def describe(self):
+        transient = f"{self.transient}" if not self.evicted else f"največ {self.transient}"
+        if self.period == 1:
+            return f"Stanje se je ustalilo po {transient} generacijah."
+        return f"Najden cikel s periodo {self.period} po {transient} generacijah."
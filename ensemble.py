@@ -0,0 +1,78 @@
+import numpy as np
+from two import create_initial_state_2d, compile_rule, generate_next_gen_rule, DEFAULT_RULE
+
+# Ensemble of independent 2D grids, stepped together as one (B, H, W) array.
+# Like animate2, a member counts as converged after `patience` generations without change;
+# converged members are dropped from the active batch, so the remaining ones step faster.
+
+
+class Ensemble:
+    def __init__(self, grids, rule=DEFAULT_RULE, patience=15, fill_ratios=None):
+        if isinstance(rule, str):
+            rule = compile_rule(rule)
+        self.rule = rule
+        self.patience = patience
+        self.grids = np.array(grids, dtype=np.uint8)  # All members, converged ones hold their final state
+        self.fill_ratios = fill_ratios  # Fill ratio of every member (create_ensemble)
+
+        members = len(self.grids)
+        self.active = np.arange(members)  # Indices of members that still change
+        self.batch = self.grids.copy()  # States of the active members only
+        self.stable_counter = np.zeros(members, dtype=int)
+        self.converged_at = np.full(members, -1)  # Generation of convergence (-1 = not yet)
+        self.generation = 0
+
+    # Function for advancing all active members by one generation, returns the number still active
+    def step(self):
+        if not len(self.active):
+            return 0
+        new_batch = generate_next_gen_rule(self.batch, self.rule)
+        changed = (new_batch != self.batch).reshape(len(self.active), -1).any(axis=1)
+        self.generation += 1
+
+        counter = np.where(changed, 0, self.stable_counter[self.active] + 1)
+        self.stable_counter[self.active] = counter
+        converged = counter >= self.patience
+        if converged.any():
+            done = self.active[converged]
+            self.grids[done] = new_batch[converged]  # Keep the final state, then drop from the batch
+            self.converged_at[done] = self.generation
+            self.active, new_batch = self.active[~converged], new_batch[~converged]
+        self.batch = new_batch
+        return len(self.active)
+
+    # Function for stepping until all members converged or max_steps generations passed
+    def run(self, max_steps=1000):
+        while len(self.active) and self.generation < max_steps:
+            self.step()
+        return self.state()
+
+    # Function for getting the current state of all members as a (B, H, W) array
+    def state(self):
+        self.grids[self.active] = self.batch
+        return self.grids
+
+
+# Function for creating an ensemble with `members` random grids for every fill ratio
+def create_ensemble(size, fill_ratios, members=100, rule=DEFAULT_RULE, patience=15, seed=None):
+    if seed is not None:
+        np.random.seed(seed)
+    ratios = np.repeat(np.asarray(fill_ratios, dtype=float), members)
+    grids = [create_initial_state_2d(size, fill_ratio=ratio) for ratio in ratios]
+    return Ensemble(grids, rule, patience, ratios)
+
+
+# Function for summarizing the ensemble per fill ratio: mean final density and mean convergence time
+def summarize_by_fill_ratio(ensemble):
+    grids = ensemble.state()
+    density = (grids[:, 2:-2, 2:-2] == 1).mean(axis=(1, 2))  # Leave out the fixed border
+    summary = {}
+    for ratio in np.unique(ensemble.fill_ratios):
+        members = ensemble.fill_ratios == ratio
+        converged = ensemble.converged_at[members]
+        summary[float(ratio)] = {
+            'density': float(density[members].mean()),
+            'converged': float((converged >= 0).mean()),
+            'steps': float(converged[converged >= 0].mean()) if (converged >= 0).any() else -1.0,
+        }
+    return summary
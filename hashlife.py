@@ -0,0 +1,211 @@
+import numpy as np
+from two import compile_rule, DEFAULT_RULE
+
+# HashLife engine for Life-like rules (2 states).
+# The world is an unbounded plane (no fixed border like in two.py), stored as a quadtree
+# of canonical nodes: equal sub-squares are the same object, so their futures are computed once.
+
+
+class Node:
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level  # Node covers 2^level x 2^level cells
+        self.population = population
+
+
+DEAD = Node(None, None, None, None, 0, 0)
+ALIVE = Node(None, None, None, None, 0, 1)
+
+
+class HashLife:
+    def __init__(self, rule=DEFAULT_RULE, max_nodes=1_000_000):
+        if isinstance(rule, str):
+            rule = compile_rule(rule)
+        if rule.states != 2:
+            raise ValueError("HashLife supports only Life-like rules with 2 states")
+        if 0 in rule.birth:
+            raise ValueError("Rules with B0 would fill the whole unbounded plane")
+        self.rule = rule
+        self.max_nodes = max_nodes  # Node table size that triggers garbage collection
+
+        self.nodes = {}  # (nw, ne, sw, se) -> canonical node
+        self.results = {}  # (node, j) -> centre of node after 2^j generations
+        self.empty_nodes = [DEAD]  # Empty node for every level
+
+        self.root = self.empty(3)
+        self.origin = (0, 0)  # World coordinates (row, col) of the root's top-left cell
+        self.generation = 0
+
+    # Function for getting the canonical node with given children
+    def join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    # Function for getting the empty node of given level
+    def empty(self, level):
+        while len(self.empty_nodes) <= level:
+            e = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(e, e, e, e))
+        return self.empty_nodes[level]
+
+    # Function for surrounding the node with empty cells (one level up, same centre)
+    def expand(self, node):
+        e = self.empty(node.level - 1)
+        return self.join(self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+                         self.join(e, node.sw, e, e), self.join(node.se, e, e, e))
+
+    # Function for getting the centre sub-square (one level down)
+    def centre(self, node):
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    # Function for checking if all live cells are inside the centre sub-square
+    def is_padded(self, node):
+        return self.centre(node).population == node.population
+
+    # Function for computing the centre 2x2 cells of a 4x4 node after one generation
+    def base_case(self, node):
+        cells = np.zeros((4, 4), dtype=np.uint8)
+        for i, row in enumerate(((node.nw, node.ne), (node.sw, node.se))):
+            for j, quadrant in enumerate(row):
+                cells[2 * i, 2 * j] = quadrant.nw.population
+                cells[2 * i, 2 * j + 1] = quadrant.ne.population
+                cells[2 * i + 1, 2 * j] = quadrant.sw.population
+                cells[2 * i + 1, 2 * j + 1] = quadrant.se.population
+
+        new_cells = []
+        for i in (1, 2):
+            for j in (1, 2):
+                neighbors = cells[i - 1:i + 2, j - 1:j + 2].sum() - cells[i, j]
+                new_cells.append(ALIVE if self.rule.table[cells[i, j], neighbors] else DEAD)
+        return self.join(*new_cells)
+
+    # Function for computing the centre of the node after 2^j generations (j <= level - 2)
+    def successor(self, node, j):
+        j = min(j, node.level - 2)
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if node.population == 0:
+            result = self.empty(node.level - 1)
+        elif node.level == 2:
+            result = self.base_case(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # Nine overlapping sub-squares of level - 1
+            c1 = self.successor(nw, j)
+            c2 = self.successor(self.join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self.successor(ne, j)
+            c4 = self.successor(self.join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self.successor(self.join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self.successor(self.join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self.successor(sw, j)
+            c8 = self.successor(self.join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self.successor(se, j)
+
+            if j < node.level - 2:
+                # Children already advanced 2^j generations, only take their centres
+                result = self.join(self.join(c1.se, c2.sw, c4.ne, c5.nw),
+                                   self.join(c2.se, c3.sw, c5.ne, c6.nw),
+                                   self.join(c4.se, c5.sw, c7.ne, c8.nw),
+                                   self.join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                # Advance the four combined quadrants for the second half of the jump
+                result = self.join(self.successor(self.join(c1, c2, c4, c5), j),
+                                   self.successor(self.join(c2, c3, c5, c6), j),
+                                   self.successor(self.join(c4, c5, c7, c8), j),
+                                   self.successor(self.join(c5, c6, c8, c9), j))
+
+        self.results[key] = result
+        return result
+
+    # Function for advancing the root by 2^j generations
+    def jump(self, j):
+        root, (row, col) = self.root, self.origin
+        while root.level < j + 2 or not self.is_padded(root):
+            row, col = row - 2 ** (root.level - 1), col - 2 ** (root.level - 1)
+            root = self.expand(root)
+        # One more empty ring, so nothing can leave the centre during the jump
+        row, col = row - 2 ** (root.level - 1), col - 2 ** (root.level - 1)
+        root = self.expand(root)
+
+        self.root = self.successor(root, j)
+        self.origin = (row + 2 ** (root.level - 2), col + 2 ** (root.level - 2))
+        self.generation += 2 ** j
+        self.collect()
+
+    # Function for advancing the root by any number of generations
+    def step(self, generations=1):
+        j = 0
+        while generations:
+            if generations & 1:
+                self.jump(j)
+            generations >>= 1
+            j += 1
+
+    # Function for freeing nodes that are no longer reachable from the root
+    def collect(self):
+        if len(self.nodes) <= self.max_nodes:
+            return
+        reachable = {}
+        stack = [self.root] + self.empty_nodes[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in reachable:
+                reachable[key] = node
+                stack.extend(key)
+        self.nodes = reachable
+        self.results = {}
+
+    # Function for loading a dense grid, its top-left cell is at world (0, 0)
+    def from_grid(self, grid):
+        size = max(grid.shape)
+        level = max(3, int(np.ceil(np.log2(max(size, 1)))))
+        cells = np.zeros((2 ** level, 2 ** level), dtype=bool)
+        cells[:grid.shape[0], :grid.shape[1]] = grid == 1
+
+        def build(row, col, level):
+            if level == 0:
+                return ALIVE if cells[row, col] else DEAD
+            half = 2 ** (level - 1)
+            if not cells[row:row + 2 * half, col:col + 2 * half].any():
+                return self.empty(level)
+            return self.join(build(row, col, level - 1), build(row, col + half, level - 1),
+                             build(row + half, col, level - 1), build(row + half, col + half, level - 1))
+
+        self.root = build(0, 0, level)
+        self.origin = (0, 0)
+        self.generation = 0
+
+    # Function for drawing a window of the world into a dense grid
+    def to_grid(self, rows, cols=None, top=0, left=0):
+        cols = rows if cols is None else cols
+        grid = np.zeros((rows, cols), dtype=int)
+
+        def fill(node, row, col):
+            size = 2 ** node.level
+            if node.population == 0 or row >= top + rows or col >= left + cols \
+                    or row + size <= top or col + size <= left:
+                return
+            if node.level == 0:
+                grid[row - top, col - left] = 1
+                return
+            half = size // 2
+            fill(node.nw, row, col)
+            fill(node.ne, row, col + half)
+            fill(node.sw, row + half, col)
+            fill(node.se, row + half, col + half)
+
+        fill(self.root, *self.origin)
+        return grid
@@ -0,0 +1,252 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import zipfile
+import numpy as np
+
+# Headless runs: simulate at full speed and stream states to video (ffmpeg), GIF, NPZ/HDF5 or a replay log.
+# Frames are rendered and encoded on a background thread, so encoding overlaps with simulation.
+
+DEFAULT_SIZES = {'1': 100, '2': 50, '3': 20, '4': 20}
+DEFAULT_STEPS = {'1': 50, '2': 20, '3': 100, '4': 100}
+# Steppers used without --backend: whole-row NumPy for 1D, update_cell loops (the original rules) for the sand
+DEFAULT_BACKENDS = {'1': 'numpy', '2': 'numpy', '3': 'python', '4': 'python'}
+VIDEO_FORMATS = ('.mp4', '.mkv', '.avi', '.gif')
+
+
+# Writer that pipes RGB frames into ffmpeg (format by file extension)
+class FFmpegWriter:
+    needs_frames = True
+
+    def __init__(self, path, fps=30):
+        self.path = path
+        self.fps = fps
+        self.process = None
+
+    def write(self, frame, state):
+        if self.process is None:
+            ffmpeg = shutil.which('ffmpeg')
+            if ffmpeg is None:
+                raise RuntimeError("ffmpeg ni nameščen (ffmpeg not found on PATH)")
+            height, width = frame.shape[:2]
+            command = [ffmpeg, '-y', '-loglevel', 'error',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps),
+                       '-i', '-']
+            if not self.path.endswith('.gif'):
+                command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p']  # yuv420p needs even sizes
+            self.process = subprocess.Popen(command + [self.path], stdin=subprocess.PIPE)
+        self.process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed writing {self.path}")
+
+
+# Writer that stores raw states in one compressed .npz, one array per field and chunk of steps
+# np.load(path) gives e.g. 'grid_00000' with shape (chunk_size, rows, cols)
+class NpzWriter:
+    needs_frames = False
+
+    def __init__(self, path, chunk_size=100):
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.chunk_index = 0
+
+    def write(self, frame, state):
+        self.chunk.append(state)
+        if len(self.chunk) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.chunk:
+            return
+        for name in self.chunk[0]:
+            data = np.stack([state[name] for state in self.chunk])
+            with self.zip.open(f'{name}_{self.chunk_index:05d}.npy', 'w', force_zip64=True) as file:
+                np.lib.format.write_array(file, data)
+        self.chunk = []
+        self.chunk_index += 1
+
+    def close(self):
+        self.flush()
+        self.zip.close()
+
+
+# Writer that appends raw states to resizable, chunked and compressed HDF5 datasets (needs h5py)
+class Hdf5Writer:
+    needs_frames = False
+
+    def __init__(self, path, chunk_size=100):
+        try:
+            import h5py
+        except ImportError:
+            raise RuntimeError("Za HDF5 potrebujete h5py (pip install h5py)")
+        self.file = h5py.File(path, 'w')
+        self.chunk_size = chunk_size
+        self.steps = 0
+
+    def write(self, frame, state):
+        for name, data in state.items():
+            if name not in self.file:
+                self.file.create_dataset(name, shape=(0,) + data.shape, maxshape=(None,) + data.shape,
+                                         dtype=data.dtype, chunks=(self.chunk_size,) + data.shape,
+                                         compression='gzip')
+            dataset = self.file[name]
+            dataset.resize(self.steps + 1, axis=0)
+            dataset[self.steps] = data
+        self.steps += 1
+
+    def close(self):
+        self.file.close()
+
+
+# Writer that renders and writes states on a background thread
+class BackgroundWriter:
+    def __init__(self, writers, render, max_queue=16):
+        self.writers = writers
+        self.render = render
+        self.queue = queue.Queue(maxsize=max_queue)  # Bounded, so frames never pile up in memory
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        needs_frames = any(writer.needs_frames for writer in self.writers)
+        while True:
+            state = self.queue.get()
+            if state is None:
+                break
+            if self.error is not None:
+                continue  # Keep draining so the simulation thread is never blocked
+            try:
+                frame = self.render(state) if needs_frames else None
+                for writer in self.writers:
+                    writer.write(frame, state)
+            except Exception as error:
+                self.error = error
+
+    def write(self, state):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(state)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        for writer in self.writers:
+            writer.close()
+        if self.error is not None:
+            raise self.error
+
+
+# Function for opening a writer by file extension
+# seed: seed of the simulated world, stored in replay files so a run can be continued
+def open_writer(path, fps=30, chunk_size=100, seed=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in VIDEO_FORMATS:
+        return FFmpegWriter(path, fps)
+    elif extension == '.npz':
+        return NpzWriter(path, chunk_size)
+    elif extension in ('.h5', '.hdf5'):
+        return Hdf5Writer(path, chunk_size)
+    elif extension == '.replay':
+        from replay import ReplayWriter
+        return ReplayWriter(path, seed=seed)
+    raise ValueError(f"Unknown output format: {path}")
+
+
+# Function for creating the frame renderer of an automaton type (rule: B/S string of type 2)
+def make_renderer(automaton_type, size, scale=4, rule=None):
+    if automaton_type == '1':
+        window = np.zeros((size, size), dtype=np.uint8)  # Scrolling space-time diagram
+
+        def render(state):
+            window[:-1] = window[1:]
+            window[-1] = state['cells']
+            return np.repeat(((1 - window) * 255).astype(np.uint8)[:, :, None], 3, axis=2)  # 'binary' colors
+        return render
+
+    elif automaton_type == '2':
+        from two import compile_rule, DEFAULT_RULE
+        states = compile_rule(rule or DEFAULT_RULE).states
+        levels = (np.arange(states) * (255 // (states - 1))).astype(np.uint8)  # 'gray', Generations states 0..C-1
+        return lambda state: np.repeat(levels[state['grid']][:, :, None], 3, axis=2)
+
+    from avatar import render_grid
+    return lambda state: render_grid(state['grid'], state['water_amount'], scale)
+
+
+# Function for getting the backend of an automaton type (None = DEFAULT_BACKENDS)
+# Type 2 steps a compiled rule table (two.generate_next_gen_rule), which only has a NumPy version
+def resolve_backend(automaton_type, backend=None):
+    if backend is None:
+        return DEFAULT_BACKENDS.get(automaton_type)
+    if automaton_type == '2' and backend != 'numpy':
+        raise ValueError(f"Type 2 runs only on the numpy backend: {backend}")
+    return backend
+
+
+# Function for simulating an automaton type, yields a copy of the state for every step
+# profiler (profiler.StepProfiler) records the steps of the sand worlds (types 3/4)
+def simulate(automaton_type, size, steps, rule_number=30, rule=None, backend=None, profiler=None, seed=None):
+    backend = resolve_backend(automaton_type, backend)
+    if automaton_type == '1':
+        from one import get_rule_binary, generate_next_gen_1d
+        rule_binary = get_rule_binary(rule_number)
+        cells = np.zeros(size, dtype=int)
+        cells[size // 2] = 1
+        for _ in range(steps):
+            yield {'cells': cells.copy()}
+            cells = generate_next_gen_1d(cells, rule_binary, backend)
+
+    elif automaton_type == '2':
+        from two import create_initial_state_2d, compile_rule, generate_next_gen_rule, DEFAULT_RULE
+        compiled = compile_rule(rule or DEFAULT_RULE)
+        grid = create_initial_state_2d(size, fill_ratio=0.40)
+        for _ in range(steps):
+            yield {'grid': grid.copy()}
+            grid = generate_next_gen_rule(grid, compiled)
+
+    elif automaton_type in ('3', '4'):
+        from avatar import create_initial_world, create_test_world
+        world = create_initial_world(size, seed) if automaton_type == '3' else create_test_world(size, seed)
+        world.profiler = profiler
+        for _ in range(steps):
+            yield {'grid': world.grid.copy(), 'water_amount': world.water_amount.copy(),
+                   'smoke_life': world.smoke_life.copy()}
+            world.step(backend)
+
+    else:
+        raise ValueError(f"Unknown automaton type: {automaton_type}")
+
+
+# Function for running an automaton without a GUI and streaming it to the outputs
+def run_headless(automaton_type, steps=None, size=None, outputs=(), fps=30, scale=4, seed=None,
+                 rule_number=30, rule=None, backend=None, chunk_size=100, profiler=None):
+    backend = resolve_backend(automaton_type, backend)  # Before any output file is opened
+    size = size or DEFAULT_SIZES[automaton_type]
+    steps = steps or DEFAULT_STEPS[automaton_type]
+    if seed is not None:
+        np.random.seed(seed)
+
+    writer = None
+    if outputs:
+        writer = BackgroundWriter([open_writer(path, fps, chunk_size, seed) for path in outputs],
+                                  make_renderer(automaton_type, size, scale, rule))
+
+    start = time.perf_counter()
+    try:
+        for state in simulate(automaton_type, size, steps, rule_number, rule, backend, profiler, seed):
+            if writer is not None:
+                writer.write(state)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"Simulacija končana: {steps} korakov v {elapsed:.2f} s ({steps / elapsed:.1f} korakov/s)")
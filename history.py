@@ -0,0 +1,115 @@
+import json
+import numpy as np
+from one import (get_rule_binary, generate_next_gen_1d_fast, pack_row, compile_rule_packed,
+                 generate_next_gen_1d_packed, BOUNDARY_MODES)
+
+# On-disk history of the 1D automaton for very long space-time diagrams.
+# Generations are written row by row into a memory-mapped .npy file (bit-packed or one uint8 per cell),
+# metadata goes next to it into path + '.json'. Reading and drawing only touch the visible window,
+# so memory use does not depend on the size of the diagram.
+
+
+# Function for simulating the 1D automaton straight into a memory-mapped file
+def write_history_1d(path, initial_gen, rule_number, steps, boundary='constant', packed=True):
+    if boundary not in BOUNDARY_MODES:
+        raise ValueError(f"Unknown boundary: {boundary}")
+    rule_binary = get_rule_binary(rule_number)
+    width = len(initial_gen)
+    row_bytes = -(-width // 64) * 8 if packed else width  # Packed rows are whole uint64 words
+
+    rows = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(steps, row_bytes))
+    if packed:
+        rule_fn = compile_rule_packed(rule_binary)
+        words = pack_row(initial_gen)
+        for t in range(steps):
+            rows[t] = words.view(np.uint8)
+            words = generate_next_gen_1d_packed(words, width, rule_fn, boundary)
+    else:
+        cells = np.asarray(initial_gen, dtype=np.uint8)
+        for t in range(steps):
+            rows[t] = cells
+            cells = generate_next_gen_1d_fast(cells, rule_binary, boundary)
+    rows.flush()
+    del rows
+
+    metadata = {'rule': rule_number, 'width': width, 'steps': steps, 'boundary': boundary, 'packed': packed}
+    with open(path + '.json', 'w') as file:
+        json.dump(metadata, file)
+    return metadata
+
+
+# Function for pooling a 2D array down to the given shape (max or mean over blocks)
+def pool(cells, shape, mode='max'):
+    if mode not in ('max', 'mean'):
+        raise ValueError(f"Unknown pooling mode: {mode}")
+    for axis, size in enumerate(shape):
+        n = cells.shape[axis]
+        if size >= n:
+            continue
+        edges = np.arange(size) * n // size  # Block starts, blocks differ in size by at most 1
+        if mode == 'max':
+            cells = np.maximum.reduceat(cells, edges, axis=axis)
+        else:
+            counts = np.diff(np.append(edges, n))
+            cells = np.add.reduceat(cells, edges, axis=axis, dtype=np.float32)
+            cells /= counts.reshape([-1 if a == axis else 1 for a in range(cells.ndim)])
+    return cells
+
+
+# Stored space-time diagram, opened read-only through a memory map
+class History:
+    def __init__(self, path):
+        with open(path + '.json') as file:
+            self.metadata = json.load(file)
+        self.rows = np.load(path, mmap_mode='r')
+        self.steps = self.metadata['steps']
+        self.width = self.metadata['width']
+        self.packed = self.metadata['packed']
+
+    # Function for reading generations [row0, row1) and cells [col0, col1) as 0/1
+    def window(self, row0, row1, col0, col1):
+        if not self.packed:
+            return np.array(self.rows[row0:row1, col0:col1])
+        byte0, byte1 = col0 // 8, -(-col1 // 8)  # Only the bytes that hold the window
+        bits = np.unpackbits(self.rows[row0:row1, byte0:byte1], axis=1, bitorder='little')
+        return bits[:, col0 - 8 * byte0:col1 - 8 * byte0]
+
+    # Function for reading a window pooled down to at most shape (rows, cols), one output row at a time
+    def view(self, row0, row1, col0, col1, shape=(800, 1200), mode='max'):
+        out_rows = min(shape[0], row1 - row0)
+        out_cols = min(shape[1], col1 - col0)
+        edges = row0 + np.arange(out_rows + 1) * (row1 - row0) // out_rows
+        image = np.zeros((out_rows, out_cols), dtype=np.float32)
+        for k in range(out_rows):
+            block = self.window(edges[k], edges[k + 1], col0, col1)
+            image[k] = pool(block, (1, out_cols), mode)[0]
+        return image
+
+
+# Function for browsing a stored diagram, zooming reloads only the visible window at screen resolution
+def show_history(path, mode='max', shape=(800, 1200)):
+    from matplotlib import pyplot as plt
+    history = History(path)
+    fig, ax = plt.subplots()
+    img = ax.imshow(history.view(0, history.steps, 0, history.width, shape, mode), cmap='binary',
+                    interpolation='nearest', vmin=0, vmax=1, aspect='auto',
+                    extent=(-0.5, history.width - 0.5, history.steps - 0.5, -0.5))
+    ax.set_autoscale_on(False)  # set_extent must not move the view while zooming
+
+    # Function for redrawing the visible window after zoom or pan
+    def update(_):
+        (x0, x1), (y1, y0) = ax.get_xlim(), ax.get_ylim()
+        col0, col1 = max(0, int(np.floor(x0 + 0.5))), min(history.width, int(np.ceil(x1 + 0.5)))
+        row0, row1 = max(0, int(np.floor(y0 + 0.5))), min(history.steps, int(np.ceil(y1 + 0.5)))
+        if col1 <= col0 or row1 <= row0:
+            return
+        img.set_data(history.view(row0, row1, col0, col1, shape, mode))
+        img.set_extent((col0 - 0.5, col1 - 0.5, row1 - 0.5, row0 - 0.5))
+
+    ax.callbacks.connect('xlim_changed', update)
+    ax.callbacks.connect('ylim_changed', update)
+    rule, boundary = history.metadata['rule'], history.metadata['boundary']
+    ax.set_title(f'1D Cellular Automaton - Rule {rule} ({history.steps} x {history.width}, {boundary})')
+    ax.set_xlabel('Cell Index')
+    ax.set_ylabel('Generations')
+    plt.show()
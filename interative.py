@@ -1,9 +1,10 @@
+import queue
+import threading
+import time
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
-from matplotlib import animation
-from PIL import Image
-from avatar import generate_next_gen, draw_grid
+from matplotlib.widgets import Button, Slider
+from avatar import World, DirtyRenderer, CELL_DTYPE
 
 EMPTY = 0
 WALL = 1
@@ -26,104 +27,214 @@ element_labels = {
     ICE: "Led"
 }
 
-textures = {
-    EMPTY: np.array(Image.open("tiles/empty.png").convert("RGB")),
-    WALL: np.array(Image.open("tiles/wall.png").convert("RGB")),
-    SAND: np.array(Image.open("tiles/sand.png").convert("RGB")),
-    WOOD: np.array(Image.open("tiles/wood.png").convert("RGB")),
-    FIRE: np.array(Image.open("tiles/fire.png").convert("RGB")),
-    SMOKE_DARK: np.array(Image.open("tiles/smoke_dark.png").convert("RGB")),
-    SMOKE_LIGHT: np.array(Image.open("tiles/smoke_light.png").convert("RGB")),
-    WATER: [
-        np.array(Image.open("tiles/light_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/medium_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/dark_blue.png").convert("RGB")),
-        np.array(Image.open("tiles/full_blue.png").convert("RGB")),
-    ],
-    ICE: np.array(Image.open("tiles/ice.png").convert("RGB"))
-}
+# Function for painting a disk of cells around (row, col) with an element
+def paint(world, element, row, col, radius=0):
+    grid, water_amount, smoke_life = world.grid, world.water_amount, world.smoke_life
+    r0, r1 = max(row - radius, 0), min(row + radius + 1, grid.shape[0])
+    c0, c1 = max(col - radius, 0), min(col + radius + 1, grid.shape[1])
+    if r0 >= r1 or c0 >= c1:
+        return
+    rows, cols = np.ogrid[r0:r1, c0:c1]
+    disk = (rows - row) ** 2 + (cols - col) ** 2 <= radius ** 2
+    grid, water_amount, smoke_life = grid[r0:r1, c0:c1], water_amount[r0:r1, c0:c1], smoke_life[r0:r1, c0:c1]
 
-selected_element = EMPTY
-grid = None
-water_amount = None
+    if element == WATER:  # Water is a special case
+        existing = disk & (grid == WATER)
+        water_amount[existing] = np.minimum(water_amount[existing] + 0.25, 1.5)  # add 1/4 water
+        new = disk & (grid != WATER)
+        grid[new] = WATER
+        water_amount[new] = 0.25  # On first paint, set water level to 1/4
+    else:
+        grid[disk] = element
+        water_amount[disk] = 0
+    smoke_life[disk] = 0
 
-# Function to set the selected element
-def set_element(element):
-    global selected_element
-    selected_element = element
-    print(f"Izbran element: {element_labels[element]}")
+# Simulation running on its own thread at its own tick rate
+# After every step (or batch of edits) the world is copied into the back buffer and the buffers are swapped,
+# the GUI only ever reads the front buffer (under lock), so a slow step never blocks drawing or clicks.
+# Edits and commands from the GUI are queued and applied by the simulation thread between steps.
+class SimulationThread:
+    def __init__(self, world, backend='python', tick=0.1):
+        self.world = world  # Only touched by the simulation thread once it runs
+        self.backend = backend
+        self.tick = tick  # Seconds between steps
+        self.buffers = [(world.grid.copy(), world.water_amount.copy()) for _ in range(2)]  # (grid, water)
+        self.front = 0  # Buffer with the latest completed state
+        self.version = 0  # Number of published states
+        self.lock = threading.Lock()  # Held while the front buffer is read or the buffers are swapped
+        self.commands = queue.SimpleQueue()  # ('paint', element, row, col, radius) or ('steps', n)
+        self.wake = threading.Event()
+        self.remaining = 0  # Steps left to simulate
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
 
-def start_simulation(steps):
-    global grid, ani
-    print("Začel bom simulacijo...")
+    def start(self):
+        self.thread.start()
 
-    fig, ax = plt.subplots()
+    # Function for queueing a brush edit
+    def paint(self, element, row, col, radius=0):
+        self.commands.put(('paint', element, row, col, radius))
+        self.wake.set()
 
-    def animate(frame_num):
-        global grid, smoke_life, water_amount
-        grid[:] = generate_next_gen(grid, steps, water_amount)  # Update grid
-        draw_grid(ax, len(grid))
-        plt.draw()
-
-    ani = animation.FuncAnimation(fig, animate, frames=steps, interval=300)
-    plt.show()
+    # Function for queueing the given number of steps
+    def simulate(self, steps):
+        self.commands.put(('steps', steps))
+        self.wake.set()
 
+    # Function for getting the latest completed (grid, water_amount), call with the lock held
+    def latest(self):
+        return self.buffers[self.front]
 
-# Function to draw the grid with textures
-def draw_grid(ax_grid, grid_size):
-    global water_amount
-    if water_amount is None:
-        water_amount = np.zeros((grid_size, grid_size), dtype=float)
+    # Function for copying the world into the back buffer and making it the front one
+    def publish(self):
+        grid, water_amount = self.buffers[1 - self.front]
+        grid[:] = self.world.grid
+        water_amount[:] = self.world.water_amount
+        with self.lock:
+            self.front = 1 - self.front
+            self.version += 1
 
-    ax_grid.clear()
-    img = np.zeros((grid_size * 32, grid_size * 32, 3), dtype=np.uint8)
-    for i in range(grid_size):
-        for j in range(grid_size):
-            if grid[i, j] == WATER:
-                water_level = water_amount[i, j]
-                #print(f"Risanje celice ({i}, {j}) z nivojem {water_level:.2f} vode.")  # Dodan izpis
-                if water_level <= 0.25:
-                    cell_texture = textures[WATER][0]  # 1/4 polna celica
-                elif water_level <= 0.5:
-                    cell_texture = textures[WATER][1]  # 1/2 polna celica
-                elif water_level <= 0.75:
-                    cell_texture = textures[WATER][2]  # 3/4 polna celica
-                else:
-                    cell_texture = textures[WATER][3]  # Polna celica
-
-                img[i * 32:(i + 1) * 32, j * 32:(j + 1) * 32] = cell_texture
+    # Function for applying the queued commands and, if step is True, one simulation step
+    def update(self, step):
+        changed = False
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                break
+            if command[0] == 'paint':
+                paint(self.world, *command[1:])
+                changed = True
             else:
-                img[i * 32:(i + 1) * 32, j * 32:(j + 1) * 32] = textures[grid[i, j]]
+                self.remaining = command[1]
 
-    ax_grid.imshow(img)
+        if step and self.remaining > 0:
+            self.world.step(self.backend)
+            self.remaining -= 1
+            changed = True
+        if changed:
+            self.publish()
+
+    def run(self):
+        next_step = time.perf_counter()
+        while not self.stopped:
+            self.wake.clear()  # Before reading the queue, so a command queued after this wakes the next wait
+            now = time.perf_counter()
+            due = now >= next_step
+            self.update(due)
+            if due:
+                next_step = max(next_step + self.tick, now)  # A slow step delays the next one, no catching up
+            self.wake.wait(max(next_step - time.perf_counter(), 0) if self.remaining > 0 else None)
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+# State of one interactive simulation: the simulation thread, the brush and what has been drawn
+class Editor:
+    __slots__ = ('world', 'simulation', 'selected_element', 'brush_radius', 'painting', 'last_cell', 'renderers',
+                 'version', 'timer', 'background')
+
+    def __init__(self, world, backend='python', tick=0.1):
+        self.world = world
+        self.simulation = SimulationThread(world, backend, tick)
+        self.selected_element = EMPTY
+        self.brush_radius = 0
+        self.painting = False  # Mouse button held down over the grid
+        self.last_cell = None  # Last painted cell, a drag paints every cell only once
+        self.renderers = {}  # Axes -> (image, DirtyRenderer)
+        self.version = -1  # Simulation version shown
+        self.timer = None  # GUI refresh timer (kept so it is not garbage collected)
+        self.background = None  # Grid axes without the image, saved after every full draw (see save_background)
+
+# Function to set the selected element
+def set_element(editor, element):
+    editor.selected_element = element
+    print(f"Izbran element: {element_labels[element]}")
+
+def start_simulation(editor, steps):
+    print("Začel bom simulacijo...")
+    editor.simulation.simulate(steps)
+
+
+# Function to draw the latest state of the simulation with textures
+# The image is created once per axes, after that only changed cells are drawn into it
+def draw_grid(editor, ax_grid, grid_size):
+    simulation = editor.simulation
+    if ax_grid in editor.renderers:
+        img, renderer = editor.renderers[ax_grid]
+        with simulation.lock:  # The simulation thread cannot swap the buffers while they are drawn
+            editor.version = simulation.version
+            if renderer.render(*simulation.latest()):
+                img.stale = True
+        return img
+
+    ax_grid.clear()
+    renderer = DirtyRenderer()
+    with simulation.lock:
+        editor.version = simulation.version
+        renderer.render(*simulation.latest())
+    img = ax_grid.imshow(renderer.frame)
+    renderer.attach(img)
+    editor.renderers[ax_grid] = (img, renderer)
 
     # Set grid lines
     ax_grid.set_xticks(np.arange(0, grid_size * 32, 32))
     ax_grid.set_yticks(np.arange(0, grid_size * 32, 32))
     ax_grid.grid(True, color='black', linewidth=0.5)
     ax_grid.tick_params(left=False, bottom=False, labelleft=False, labelbottom=False)
+    return img
 
-# Function to place elements on click
-def on_click(event, ax_grid, grid_size):
-    if event.inaxes == ax_grid:
-        x, y = int(event.xdata // 32), int(event.ydata // 32)
-        if 0 <= x < grid_size and 0 <= y < grid_size:
-            if selected_element == WATER: # Water is a special case
-                if grid[y, x] == WATER:
-                    water_amount[y, x] = min(water_amount[y, x] + 0.25, 1.5)  # add 1/4 water
-                else:
-                    grid[y, x] = WATER
-                    water_amount[y, x] = 0.25  # On first click, set water level to 1/4
-            else:
-                grid[y, x] = selected_element
+# Function for drawing the image and the grid lines over it (the image is animated, full draws skip it)
+def draw_image(editor, ax_grid):
+    img, _ = editor.renderers[ax_grid]
+    ax_grid.draw_artist(img)
+    for line in ax_grid.get_xgridlines() + ax_grid.get_ygridlines():
+        ax_grid.draw_artist(line)
 
-            draw_grid(ax_grid, grid_size)
-            plt.draw()
+# Function for saving the grid axes without the image after a full draw (draw_event), used by refresh to blit
+def save_background(editor, ax_grid):
+    canvas = ax_grid.figure.canvas
+    editor.background = canvas.copy_from_bbox(ax_grid.bbox)
+    draw_image(editor, ax_grid)
 
+# Function for redrawing the grid when the simulation published a new state (GUI timer)
+# Only the grid axes are blitted, buttons and slider are not redrawn
+def refresh(editor, ax_grid, grid_size):
+    if editor.simulation.version == editor.version:
+        return
+    draw_grid(editor, ax_grid, grid_size)
+    canvas = ax_grid.figure.canvas
+    if editor.background is None or not canvas.supports_blit:
+        canvas.draw_idle()  # No full draw yet, or a backend without blitting
+        return
+    canvas.restore_region(editor.background)
+    draw_image(editor, ax_grid)
+    canvas.blit(ax_grid.bbox)
 
-def run_interactive_simulation(grid_size, steps):
-    global grid, smoke_life, water_amount
-    grid = np.full((grid_size, grid_size), EMPTY)  # Create empty grid
+# Function to paint elements with the brush, on click and while dragging
+def on_click(editor, event, ax_grid, grid_size):
+    if event.name == 'button_release_event':
+        editor.painting = False
+        editor.last_cell = None
+        return
+    if event.name == 'button_press_event':
+        editor.painting = event.inaxes == ax_grid
+    if not editor.painting or event.inaxes != ax_grid or event.xdata is None:
+        return
+
+    x, y = int(event.xdata // 32), int(event.ydata // 32)
+    if 0 <= x < grid_size and 0 <= y < grid_size and (y, x) != editor.last_cell:
+        editor.last_cell = (y, x)
+        editor.simulation.paint(editor.selected_element, y, x, editor.brush_radius)  # Shown on the next refresh
+
+
+# backend: stepper of World.step ('numba' keeps the GUI smooth on big grids, it releases the GIL)
+# tick: seconds between simulation steps
+def run_interactive_simulation(grid_size, steps, backend='python', tick=0.1):
+    grid = np.full((grid_size, grid_size), EMPTY, dtype=CELL_DTYPE)  # Create empty grid
 
     # Add walls around the grid
     grid[0, :] = WALL
@@ -131,8 +242,8 @@ def run_interactive_simulation(grid_size, steps):
     grid[:, 0] = WALL
     grid[:, -1] = WALL
 
-    smoke_life = np.zeros((grid_size, grid_size), dtype=int)
-    water_amount = np.zeros((grid_size, grid_size), dtype=float)
+    editor = Editor(World(grid), backend, tick)
+    editor.simulation.start()
 
     # Setup figure
     fig, (ax_buttons, ax_grid) = plt.subplots(1, 2, figsize=(10, 6))
@@ -143,22 +254,36 @@ def run_interactive_simulation(grid_size, steps):
     for idx, (element, label) in enumerate(element_labels.items()):
         ax_button = plt.axes([0.02, 0.8 - 0.1 * idx, 0.13, 0.08])
         btn = Button(ax_button, label)
-        btn.on_clicked(lambda _, el=element: set_element(el))
+        btn.on_clicked(lambda _, el=element: set_element(editor, el))
         buttons.append(btn)
 
+    # Brush radius slider
+    radius_slider = Slider(plt.axes([0.2, 0.02, 0.3, 0.04]), 'Čopič', 0, max(grid_size // 4, 1), valinit=0, valstep=1)
+    radius_slider.on_changed(lambda value: setattr(editor, 'brush_radius', int(value)))
+
     # Add "Start Simulation" button
     start_btn = Button(plt.axes([0.02, 0.1, 0.13, 0.08]), 'Začni simulacijo')
-    start_btn.on_clicked(lambda _: start_simulation(steps))
+    start_btn.on_clicked(lambda _: start_simulation(editor, steps))
+
+    # Draw initial grid, after that refresh blits only the image (see save_background)
+    draw_grid(editor, ax_grid, grid_size).set_animated(True)
+    fig.canvas.mpl_connect('draw_event', lambda _: save_background(editor, ax_grid))
+
+    # Brush painting: press, drag and release over the grid
+    for name in ('button_press_event', 'motion_notify_event', 'button_release_event'):
+        fig.canvas.mpl_connect(name, lambda event: on_click(editor, event, ax_grid, grid_size))
+    fig.canvas.mpl_connect('close_event', lambda _: editor.simulation.stop())
 
-    # Draw initial grid
-    draw_grid(ax_grid, grid_size)
+    # Pick up new states of the simulation thread
+    editor.timer = fig.canvas.new_timer(interval=30)
+    editor.timer.add_callback(refresh, editor, ax_grid, grid_size)
+    editor.timer.start()
 
-    # Handle clicks for placing elements
-    fig.canvas.mpl_connect('button_press_event', lambda event: on_click(event, ax_grid, grid_size))
     plt.show()
+    editor.simulation.stop()
+    return editor
 
 if __name__ == "__main__":
     size = 10
     steps = 50
-    smoke_life = np.zeros((size, size), dtype=int)
     run_interactive_simulation(size, steps)
@@ -0,0 +1,258 @@
+import numpy as np
+from avatar import EMPTY, WALL, SAND, WOOD, FIRE, SMOKE_DARK, SMOKE_LIGHT, WATER, ICE
+
+# Compiled (Numba) versions of the Python loop steppers.
+# The kernels keep the exact scan order of one.py, two.py and avatar.py, so with the same
+# random numbers they give the same result. Without Numba the same functions run as Python.
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+
+# Function for compiling a kernel with Numba (compiled on first call, cached on disk)
+# Kernels release the GIL, so worlds on different threads step in parallel (avatar.step_worlds)
+def jit(function):
+    return njit(cache=True, nogil=True)(function) if NUMBA_AVAILABLE else function
+
+
+# Orders of 3 directions in itertools.permutations order (see avatar.random_order)
+ORDERS_3 = np.array([[0, 1, 2], [0, 2, 1], [1, 0, 2], [1, 2, 0], [2, 0, 1], [2, 1, 0]])
+
+# Water constants as float32, so the water arithmetic runs in the precision of water_amount
+# (float32 with avatar.WATER_DTYPE) like the NumPy scalars in avatar.update_cell, not in float64
+FULL = np.float32(1.0)
+HALF = np.float32(0.5)
+
+
+# Function for one generation of the 1D automaton (one.generate_next_gen_1d)
+@jit
+def step_1d(current_gen, rule_binary, next_gen):
+    n = len(current_gen)
+    for i in range(n):
+        left = current_gen[i - 1] if i > 0 else 0
+        right = current_gen[i + 1] if i < n - 1 else 0
+        idx = 7 - (left * 4 + current_gen[i] * 2 + right)
+        next_gen[i] = rule_binary[idx]
+
+
+# Function for one generation of the 2D automaton (two.generate_next_gen_2d)
+@jit
+def step_2d(grid, new_grid):
+    rows, cols = grid.shape
+    for i in range(1, rows - 1):
+        for j in range(1, cols - 1):
+            neighbors = 0
+            for di in range(-1, 2):
+                for dj in range(-1, 2):
+                    neighbors += grid[i + di, j + dj]
+            neighbors -= grid[i, j]
+            if grid[i, j] == 1:
+                if neighbors < 2 or neighbors > 8:
+                    new_grid[i, j] = 0
+            else:
+                if neighbors >= 6 and neighbors <= 8:
+                    new_grid[i, j] = 1
+
+
+# Function for checking if any of the 4 neighbors is fire
+@jit
+def near_fire(grid, i, j):
+    rows, cols = grid.shape
+    return ((i > 0 and grid[i - 1, j] == FIRE) or (i < rows - 1 and grid[i + 1, j] == FIRE) or
+            (j > 0 and grid[i, j - 1] == FIRE) or (j < cols - 1 and grid[i, j + 1] == FIRE))
+
+
+# Function for one generation of the falling-sand automaton (avatar.update_cell for every cell)
+@jit
+def step_sand(grid, new_grid, water_amount, smoke_life, rand):
+    rows, cols = grid.shape
+
+    for i in range(rows - 2, 0, -1):
+        for j in range(1, cols - 1):
+            cell = grid[i, j]
+            if cell == WALL:
+                continue
+
+            if cell == SAND:
+                below = grid[i + 1, j]
+                if below == WALL or below == WOOD:
+                    new_grid[i, j] = SAND
+                elif below == EMPTY:
+                    new_grid[i, j] = EMPTY
+                    new_grid[i + 1, j] = SAND
+                elif below == WATER:
+                    # Displace water left/right, otherwise swap places with water
+                    first = -1 if rand[i, j] < 0.5 else 1
+                    moved = False
+                    for dj in (first, -first):
+                        nj = j + dj
+                        if 0 <= nj < cols and grid[i + 1, nj] == EMPTY:
+                            new_grid[i + 1, nj] = WATER
+                            new_grid[i + 1, j] = SAND
+                            moved = True
+                            break
+                    if not moved:
+                        new_grid[i, j] = WATER
+                        new_grid[i + 1, j] = SAND
+                else:
+                    # Diagonal movement
+                    first = -1 if rand[i, j] < 0.5 else 1
+                    moved = False
+                    for dj in (first, -first):
+                        ni, nj = i + 1, j + dj
+                        if 0 <= ni < rows and 0 <= nj < cols and grid[ni, nj] == EMPTY:
+                            new_grid[i, j] = EMPTY
+                            new_grid[ni, nj] = SAND
+                            moved = True
+                            break
+                    if not moved:
+                        new_grid[i, j] = SAND
+
+            elif cell == WOOD:
+                # Wood under water floats up through the whole water column
+                current_i = i
+                while current_i > 0 and grid[current_i - 1, j] == WATER:
+                    new_grid[current_i - 1, j] = WOOD
+                    new_grid[current_i, j] = WATER
+                    water_amount[current_i, j] = min(water_amount[current_i, j] + HALF, FULL)
+                    grid[current_i - 1, j] = WOOD
+                    grid[current_i, j] = WATER
+                    current_i -= 1
+                if current_i != i:
+                    continue
+
+                left_water = j > 0 and grid[i, j - 1] == WATER and water_amount[i, j - 1] >= 0.75
+                right_water = j < cols - 1 and grid[i, j + 1] == WATER and water_amount[i, j + 1] >= 0.75
+                above_empty = i > 0 and grid[i - 1, j] == EMPTY
+                if left_water and right_water and above_empty:
+                    new_grid[i - 1, j] = WOOD
+                    new_grid[i, j] = WATER
+                    water_amount[i, j] = min(water_amount[i, j] + HALF, FULL)
+                    continue
+
+                if grid[i + 1, j] == EMPTY:
+                    new_grid[i, j] = EMPTY
+                    new_grid[i + 1, j] = WOOD
+                elif grid[i + 1, j] == WATER:
+                    new_grid[i, j] = WOOD
+                elif near_fire(grid, i, j):
+                    new_grid[i, j] = FIRE
+
+            elif cell == FIRE:
+                if grid[i + 1, j] == EMPTY:
+                    new_grid[i, j] = EMPTY
+                    new_grid[i + 1, j] = FIRE
+                elif grid[i + 1, j] == WOOD:
+                    new_grid[i + 1, j] = FIRE
+                    new_grid[i, j] = SMOKE_DARK
+                    smoke_life[i, j] = 6
+                else:
+                    new_grid[i, j] = SMOKE_LIGHT
+                    smoke_life[i, j] = 6
+
+            elif cell == SMOKE_DARK or cell == SMOKE_LIGHT:
+                if smoke_life[i, j] <= 1:  # Checked before decreasing, smoke_life can be unsigned
+                    smoke_life[i, j] = 0
+                    new_grid[i, j] = EMPTY
+                    continue
+                smoke_life[i, j] -= 1
+
+                # Up, up-left, up-right in random order
+                order = ORDERS_3[int(rand[i, j] * 6)]
+                moved = False
+                for k in range(3):
+                    dj = (0, -1, 1)[order[k]]
+                    ni, nj = i - 1, j + dj
+                    if ni < 0 or nj < 0 or nj >= cols:
+                        continue
+                    if grid[ni, nj] == EMPTY:
+                        new_grid[i, j] = EMPTY
+                        new_grid[ni, nj] = cell
+                        smoke_life[ni, nj] = smoke_life[i, j]
+                        moved = True
+                        break
+
+                if not moved:
+                    if j > 0 and grid[i, j - 1] == EMPTY:
+                        new_grid[i, j] = EMPTY
+                        new_grid[i, j - 1] = cell
+                        smoke_life[i, j - 1] = smoke_life[i, j]
+                    elif j < cols - 1 and grid[i, j + 1] == EMPTY:
+                        new_grid[i, j] = EMPTY
+                        new_grid[i, j + 1] = cell
+                        smoke_life[i, j + 1] = smoke_life[i, j]
+
+            elif cell == WATER:
+                below = grid[i + 1, j]
+                # 1. Move down into empty space
+                if below == EMPTY:
+                    transfer = min(water_amount[i, j], FULL - water_amount[i + 1, j])
+                    water_amount[i, j] -= transfer
+                    water_amount[i + 1, j] += transfer
+                    new_grid[i + 1, j] = WATER
+                    if water_amount[i, j] == 0:
+                        new_grid[i, j] = EMPTY
+
+                # 2. Spread left and right if the cell below is full
+                if below == WALL or below == SAND or below == WOOD or below == WATER:
+                    for nj in (j - 1, j + 1):
+                        if 0 <= nj < cols:
+                            if (grid[i, nj] == EMPTY or grid[i, nj] == WATER) and water_amount[i, j] > 0.01:
+                                max_transfer = min(water_amount[i, j] * HALF, FULL - water_amount[i, nj])
+                                water_amount[i, nj] += max_transfer
+                                water_amount[i, j] -= max_transfer
+                                new_grid[i, nj] = WATER
+                                if water_amount[i, j] == 0:
+                                    new_grid[i, j] = EMPTY
+
+                # 3. Too little water disappears
+                if water_amount[i, j] <= 0.01:
+                    water_amount[i, j] = 0
+                    new_grid[i, j] = EMPTY
+
+                # 4. Move down if any cell below is not full
+                if below == WATER:
+                    bottom_not_full = False
+                    for nj in (j - 1, j, j + 1):
+                        if 0 <= nj < cols and grid[i + 1, nj] == WATER and water_amount[i + 1, nj] < 1.0:
+                            bottom_not_full = True
+                            break
+                    if bottom_not_full:
+                        transfer = min(water_amount[i, j], FULL - water_amount[i + 1, j])
+                        water_amount[i, j] -= transfer
+                        water_amount[i + 1, j] += transfer
+                        new_grid[i + 1, j] = WATER
+                        if water_amount[i, j] == 0:
+                            new_grid[i, j] = EMPTY
+
+            elif cell == ICE:
+                if near_fire(grid, i, j):
+                    new_grid[i, j] = WATER
+                    water_amount[i, j] = 0.25
+                    continue
+
+                if grid[i + 1, j] == EMPTY:
+                    new_grid[i, j] = EMPTY
+                    new_grid[i + 1, j] = ICE
+                    continue
+
+                for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                    ni, nj = i + di, j + dj
+                    if 0 <= ni < rows and 0 <= nj < cols and grid[ni, nj] == WATER:
+                        new_grid[ni, nj] = ICE
+
+
+KERNELS = {
+    '1d': step_1d,
+    '2d': step_2d,
+    'sand': step_sand,
+}
+
+
+# Function for getting a kernel by name
+def get_kernel(name):
+    return KERNELS[name]
@@ -1,66 +1,124 @@
-import numpy as np
-from matplotlib import pyplot as plt
-import matplotlib.animation as animation
-from one import plot_automaton_1d
-from two import create_initial_state_2d, animate2
-from avatar import create_initial_state, draw_grid, animate, create_test_environment
-from interative import run_interactive_simulation
+import argparse
+
+# Modules for the chosen mode are imported inside its branch, so startup only pays for what the mode uses
 
 if __name__ == "__main__":
-    automaton_type = input("Izberite vrsto avtomata) (1/2/3/4): ").strip().lower()
+    parser = argparse.ArgumentParser(description="Celični avtomati")
+    parser.add_argument("type", nargs="?", choices=["1", "2", "3", "4"], help="vrsta avtomata")
+    parser.add_argument("--headless", action="store_true", help="brez okna, simulacija s polno hitrostjo")
+    parser.add_argument("--steps", type=int, help="število korakov")
+    parser.add_argument("--size", type=int, help="velikost mreže")
+    parser.add_argument("--rule", help="pravilo: 0-255 (1D) ali B/S niz (2D)")
+    parser.add_argument("-o", "--output", action="append", default=[],
+                        help="izhodna datoteka .mp4/.gif/.npz/.h5/.replay (lahko večkrat)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--scale", type=int, default=4, help="pikslov na celico (3/4)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--backend", choices=["python", "numpy", "numba"],
+                        help="korak (--headless): privzeto numpy za 1/2 (2 podpira samo numpy), python za 3/4")
+    parser.add_argument("--profile", action="store_true", help="merjenje faz koraka (3/4), v oknu prikaže HUD")
+    parser.add_argument("--profile-output", help="shrani meritve faz v .csv ali .json (Chrome trace)")
+    args = parser.parse_args()
+    if args.headless and args.type is None:
+        parser.error("--headless potrebuje vrsto avtomata")
+
+    automaton_type = args.type or input("Izberite vrsto avtomata) (1/2/3/4): ").strip().lower()
+
+    profiler = None
+    if (args.profile or args.profile_output) and automaton_type in ("3", "4"):
+        from profiler import StepProfiler
+        profiler = StepProfiler()
+
+    if args.headless:
+        if automaton_type == "2" and args.backend not in (None, "numpy"):
+            parser.error("vrsta 2 podpira samo --backend numpy")
+        from headless import run_headless
+        run_headless(automaton_type, args.steps, args.size, args.output, fps=args.fps, scale=args.scale,
+                     seed=args.seed, rule_number=int(args.rule) if automaton_type == "1" and args.rule else 30,
+                     rule=args.rule if automaton_type == "2" else None, backend=args.backend, profiler=profiler)
+
+    elif automaton_type == "1":
+        import numpy as np
+        from one import plot_automaton_1d
 
-    if automaton_type == "1":
         rule_number = int(input("Vnesite pravilo (0-255): "))
         size = 100
         steps = 50
 
         initial_gen = np.zeros(size, dtype=int) # 00000
         initial_gen[size // 2] = 1 # 00100
-        plot_automaton_1d(initial_gen, rule_number, steps)
+        plot_automaton_1d(initial_gen, rule_number, steps, stop_on_cycle=True)
 
     elif automaton_type == "2":
+        from matplotlib import pyplot as plt
+        import matplotlib.animation as animation
+        from two import create_initial_state_2d, animate2, compile_rule, DEFAULT_RULE
+        from cycles import CycleDetector
+
         size = 50
         steps = 20
 
         initial_state = create_initial_state_2d(size, fill_ratio=0.40) # fill ratio how many cells are alive
+        rule = compile_rule(DEFAULT_RULE)
 
         fig, ax = plt.subplots()
         img = ax.imshow(initial_state, cmap='gray')
         stable_counter = [0]
+        detector = CycleDetector([initial_state])
         ani = animation.FuncAnimation(fig,
-                                      lambda frame_num: animate2(frame_num, initial_state, img, stable_counter, ani),
+                                      lambda frame_num: animate2(frame_num, initial_state, img, stable_counter, ani, rule, detector),
                                       frames=steps, interval=80, repeat=False)
 
-        plt.title("2D Cellular Automaton - Rule B678/S2345678")
+        plt.title(f"2D Cellular Automaton - Rule {rule.name}")
         plt.show()
 
     elif automaton_type == "3":
+        from matplotlib import pyplot as plt
+        import matplotlib.animation as animation
+        from avatar import create_initial_world, create_active_tiles, render_grid, animate_world, DirtyRenderer
+        from cycles import CycleDetector
+
         size = 20
         steps = 100
 
-        initial_state = create_initial_state(size)
-        water_amount = np.zeros((size, size), dtype=float)
+        world = create_initial_world(size)
+        world.profiler = profiler
+        active_tiles = create_active_tiles(world.grid)
 
         fig, ax = plt.subplots()
-        img = ax.imshow(draw_grid(initial_state))
-        ani = animation.FuncAnimation(fig, animate, fargs=(initial_state, img, steps, water_amount), frames=steps, interval=300, repeat=False)
+        img = ax.imshow(render_grid(world.grid, world.water_amount))
+        detector = CycleDetector([world.grid, world.water_amount, world.smoke_life])
+        hud = ax.text(0.01, 0.99, "", transform=ax.transAxes, va="top", fontsize=7, color="white",
+                      family="monospace", animated=True) if profiler is not None else None
+        ani = animation.FuncAnimation(fig, animate_world, fargs=(world, img, active_tiles, DirtyRenderer(), detector, hud),
+                                      frames=detector.frames(steps), save_count=steps, interval=300, repeat=False, blit=True)
 
         plt.title("2D Cellular Automaton - Sand, Wood, Fire, and Smoke")
         plt.show()
 
     elif automaton_type == "4":
+        from matplotlib import pyplot as plt
+        import matplotlib.animation as animation
+        from avatar import create_test_world, render_grid, animate_world, DirtyRenderer
+        from cycles import CycleDetector
+
         size = 20
         steps = 100
 
-        initial_state = create_test_environment(size)
-        smoke_life = np.zeros((size, size), dtype=int)
-        water_amount = np.zeros((size, size), dtype=float)
+        world = create_test_world(size)
+        world.profiler = profiler
 
         fig, ax = plt.subplots()
-        img = ax.imshow(draw_grid(initial_state))
-        ani = animation.FuncAnimation(fig, animate, fargs=(initial_state, img, steps, water_amount), frames=steps, interval=70, repeat=False)
+        img = ax.imshow(render_grid(world.grid, world.water_amount))
+        detector = CycleDetector([world.grid, world.water_amount, world.smoke_life])
+        hud = ax.text(0.01, 0.99, "", transform=ax.transAxes, va="top", fontsize=7, color="white",
+                      family="monospace", animated=True) if profiler is not None else None
+        ani = animation.FuncAnimation(fig, animate_world, fargs=(world, img, None, DirtyRenderer(), detector, hud),
+                                      frames=detector.frames(steps), save_count=steps, interval=70, repeat=False, blit=True)
 
         plt.title("Testno okolje - Pesek, Les, Ogenj in Dim")
         plt.show()
 
-
+    if profiler is not None and args.profile_output:
+        profiler.write(args.profile_output)
+        print(f"Meritve faz shranjene v {args.profile_output}")
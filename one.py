@@ -1,12 +1,22 @@
 import numpy as np
-from matplotlib import pyplot as plt
 
 # Function for converting rule from decimal to binary form (8-bit)
 def get_rule_binary(rule_number):
     return np.array([int(x) for x in np.binary_repr(rule_number, width=8)])
 
 # Function for generating next generation based on the rule
-def generate_next_gen_1d(current_gen, rule_binary):
+# backend: 'python' (loop below), 'numpy' (generate_next_gen_1d_fast) or 'numba' (kernels.py)
+def generate_next_gen_1d(current_gen, rule_binary, backend='python'):
+    if backend == 'numpy':
+        return generate_next_gen_1d_fast(current_gen, rule_binary)
+    elif backend == 'numba':
+        from kernels import get_kernel
+        next_gen = np.zeros_like(current_gen)
+        get_kernel('1d')(current_gen, rule_binary, next_gen)
+        return next_gen
+    elif backend != 'python':
+        raise ValueError(f"Unknown backend: {backend}")
+
     padded_gen = np.pad(current_gen, 1, mode='constant')  # Add padding to the current generation  0 1 0 1 0
     next_gen = np.zeros_like(current_gen)
 
@@ -16,14 +26,117 @@ def generate_next_gen_1d(current_gen, rule_binary):
         next_gen[i] = rule_binary[idx]  # Apply the rule
     return next_gen
 
+# Boundary conditions -> np.pad modes
+BOUNDARY_MODES = {
+    'constant': 'constant',  # cells outside the row are 0
+    'periodic': 'wrap',  # row wraps around (ring)
+    'reflective': 'reflect',  # row is mirrored at both edges
+}
+
+# Function for generating next generation for the whole row at once (NumPy)
+def generate_next_gen_1d_fast(current_gen, rule_binary, boundary='constant'):
+    if boundary not in BOUNDARY_MODES:
+        raise ValueError(f"Unknown boundary: {boundary}")
+    padded_gen = np.pad(current_gen.astype(np.uint8), 1, mode=BOUNDARY_MODES[boundary])
+
+    # Neighborhood code left, center, right -> 0..7 for every cell
+    codes = (padded_gen[:-2] << 2) | (padded_gen[1:-1] << 1) | padded_gen[2:]
+    return rule_binary[7 - codes].astype(current_gen.dtype, copy=False)  # Apply the rule in one gather
+
+# Function for packing a row of 0/1 cells into uint64 words (64 cells per word, cell 0 = lowest bit)
+def pack_row(row):
+    packed = np.packbits(np.asarray(row, dtype=bool), bitorder='little')
+    packed = np.pad(packed, (0, -len(packed) % 8))  # Fill up the last word
+    return packed.view('<u8').astype(np.uint64)
+
+# Function for unpacking uint64 words back into an int row of given width
+def unpack_row(words, width):
+    bits = np.unpackbits(words.astype('<u8').view(np.uint8), bitorder='little')
+    return bits[:width].astype(int)
+
+# Function for compiling the rule into a boolean expression over left/center/right words
+def compile_rule_packed(rule_binary):
+    ones = [code for code in range(8) if rule_binary[7 - code]]
+    zeros = [code for code in range(8) if not rule_binary[7 - code]]
+    invert = len(ones) > len(zeros)  # Use the shorter expression: OR of ones or NOT(OR of zeros)
+    terms = zeros if invert else ones
+
+    def rule_fn(left, center, right):
+        result = np.zeros_like(center)
+        for code in terms:  # code 5 = 101 -> left & ~center & right
+            term = left if code & 4 else ~left
+            term = term & (center if code & 2 else ~center)
+            term = term & (right if code & 1 else ~right)
+            result |= term
+        return ~result if invert else result
+
+    return rule_fn
+
+# Function for generating next generation on a bit-packed row
+def generate_next_gen_1d_packed(words, width, rule_fn, boundary='constant'):
+    if boundary not in BOUNDARY_MODES:
+        raise ValueError(f"Unknown boundary: {boundary}")
+    one, top = np.uint64(1), np.uint64(63)
+    last_word, last_bit = (width - 1) // 64, np.uint64((width - 1) % 64)
+
+    # Left neighbor of cell x is cell x-1 -> shift up, carry the top bit from the previous word
+    left = words << one
+    left[1:] |= words[:-1] >> top
+    # Right neighbor of cell x is cell x+1 -> shift down, carry the lowest bit from the next word
+    right = words >> one
+    right[:-1] |= words[1:] << top
+
+    # Cells outside the row
+    def cell(idx):
+        return (words[idx // 64] >> np.uint64(idx % 64)) & one
+
+    if boundary == 'periodic':
+        left_edge, right_edge = cell(width - 1), cell(0)
+    elif boundary == 'reflective':
+        left_edge, right_edge = cell(min(1, width - 1)), cell(max(width - 2, 0))
+    else:
+        left_edge = right_edge = np.uint64(0)
+    left[0] = (left[0] & ~one) | left_edge
+    right[last_word] = (right[last_word] & ~(one << last_bit)) | (right_edge << last_bit)
+
+    next_words = rule_fn(left, words, right)
+    next_words[last_word + 1:] = 0
+    if last_bit < top:
+        next_words[last_word] &= (one << (last_bit + one)) - one  # Keep the bits past the row empty
+    return next_words
+
 # Function for plotting the 1D automaton
-def plot_automaton_1d(initial_gen, rule_number, steps=50):
+# path: write the generations into a memory-mapped file (history.py) instead of keeping them in memory
+# stop_on_cycle: stop as soon as the row repeats (cycles.CycleDetector)
+def plot_automaton_1d(initial_gen, rule_number, steps=50, boundary='constant', packed=False, path=None,
+                      stop_on_cycle=False):
+    if path is not None:
+        from history import write_history_1d, show_history
+        write_history_1d(path, initial_gen, rule_number, steps, boundary, packed)
+        show_history(path)
+        return
+
     rule_binary = get_rule_binary(rule_number)
     generations = [initial_gen] # List to store all generations
+    detector = None
+    if stop_on_cycle:
+        from cycles import CycleDetector
+        detector = CycleDetector([initial_gen])
 
+    if packed:
+        rule_fn = compile_rule_packed(rule_binary)
+        words = pack_row(initial_gen)
     for _ in range(steps - 1):
-        generations.append(generate_next_gen_1d(generations[-1], rule_binary))
+        if packed:
+            words = generate_next_gen_1d_packed(words, len(initial_gen), rule_fn, boundary)
+            generations.append(unpack_row(words, len(initial_gen)))
+        else:
+            generations.append(generate_next_gen_1d_fast(generations[-1], rule_binary, boundary))
+        if detector is not None and detector.update([generations[-1]]):
+            print(detector.describe())
+            break
 
+    from matplotlib import pyplot as plt  # Only needed for the window, not for headless runs
     plt.imshow(generations, cmap='binary', interpolation='nearest')
     plt.title(f'1D Cellular Automaton - Rule {rule_number}')
     plt.xlabel('Cell Index')
@@ -0,0 +1,175 @@
+import argparse
+import os
+import time
+import numpy as np
+from multiprocessing import Process, Barrier, Value, shared_memory
+from threading import BrokenBarrierError
+from avatar import CELL_DTYPE, WATER_DTYPE, SMOKE_DTYPE
+
+# Falling-sand world split into horizontal strips that worker processes update in parallel.
+# grid (two buffers), water_amount, smoke_life and the random plane live in shared memory.
+# Every strip runs the sand kernel on its rows plus a one-row halo above and below, and may move
+# cells into those halo rows. Strips are updated in two phases (even strips, barrier, odd strips),
+# so neighboring strips never run at the same time. The strip layout does not depend on the number
+# of workers, so the result is the same for 1 or N workers.
+
+STRIP_ROWS = 64
+
+
+# Function for splitting the inner rows 1..rows-2 into strips [r0, r1) of at least 2 rows
+def make_strips(rows, strip_rows=STRIP_ROWS):
+    strip_rows = max(2, strip_rows)
+    starts = list(range(1, rows - 1, strip_rows))
+    strips = [(r0, min(r0 + strip_rows, rows - 1)) for r0 in starts]
+    if len(strips) > 1 and strips[-1][1] - strips[-1][0] < 2:
+        strips[-2:] = [(strips[-2][0], strips[-1][1])]  # Too short, join with the previous strip
+    return strips
+
+
+# Shared arrays: two grid buffers, water, smoke, random plane
+FIELD_DTYPES = (CELL_DTYPE, WATER_DTYPE, SMOKE_DTYPE, np.float64)
+
+
+# Function for creating arrays on top of the shared memory blocks
+def shared_arrays(memories, shape):
+    grids = np.ndarray((2,) + shape, dtype=CELL_DTYPE, buffer=memories[0].buf)
+    water = np.ndarray(shape, dtype=WATER_DTYPE, buffer=memories[1].buf)
+    smoke = np.ndarray(shape, dtype=SMOKE_DTYPE, buffer=memories[2].buf)
+    rand = np.ndarray(shape, dtype=np.float64, buffer=memories[3].buf)
+    return grids, water, smoke, rand
+
+
+# Function for the main loop of a worker process: copy phase, even strips, odd strips
+def run_worker(names, shape, strips, first, barrier, stop):
+    memories = [shared_memory.SharedMemory(name=name) for name in names]
+    grids = water = smoke = rand = None
+    try:
+        from kernels import get_kernel
+        kernel = get_kernel('sand')
+        grids, water, smoke, rand = shared_arrays(memories, shape)
+        # Rows this worker copies into the new buffer (the first/last strip also copy the outer rows)
+        copies = [(0 if r0 == 1 else r0, shape[0] if r1 == shape[0] - 1 else r1) for _, (r0, r1) in strips]
+        current = first
+
+        while True:
+            barrier.wait()  # Step start
+            if stop.value:
+                break
+            grid, new_grid = grids[current], grids[1 - current]
+            for r0, r1 in copies:
+                new_grid[r0:r1] = grid[r0:r1]
+            barrier.wait()
+
+            for parity in (0, 1):
+                for index, (r0, r1) in strips:
+                    if index % 2 == parity:
+                        halo = slice(r0 - 1, r1 + 1)
+                        kernel(grid[halo], new_grid[halo], water[halo], smoke[halo], rand[halo])
+                barrier.wait()
+            current = 1 - current
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        barrier.abort()  # Wake up the main process and the other workers
+        raise
+    finally:
+        del grids, water, smoke, rand
+        for memory in memories:
+            memory.close()
+
+
+class StripSimulation:
+    def __init__(self, grid, water_amount=None, smoke_life=None, workers=None, strip_rows=STRIP_ROWS, seed=None):
+        self.shape = grid.shape
+        strips = list(enumerate(make_strips(grid.shape[0], strip_rows)))
+        workers = max(1, min(workers or os.cpu_count(), len(strips)))
+
+        sizes = [grid.size * np.dtype(dtype).itemsize * (2 if k == 0 else 1) for k, dtype in enumerate(FIELD_DTYPES)]
+        self.memories = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        self.grids, self.water, self.smoke, self.rand = shared_arrays(self.memories, self.shape)
+        self.grids[0] = grid
+        self.water[:] = 0 if water_amount is None else water_amount
+        self.smoke[:] = 0 if smoke_life is None else smoke_life
+        self.current = 0
+        self.rng = np.random.default_rng(seed)
+        self.generation = 0
+
+        self.barrier = Barrier(workers + 1)
+        self.stop = Value('b', 0)
+        names = [memory.name for memory in self.memories]
+        self.workers = []
+        for w in range(workers):
+            own = strips[w * len(strips) // workers:(w + 1) * len(strips) // workers]  # Contiguous block of strips
+            process = Process(target=run_worker, args=(names, self.shape, own, self.current, self.barrier, self.stop),
+                              daemon=True)
+            process.start()
+            self.workers.append(process)
+
+    # Function for advancing the world by the given number of steps
+    def step(self, steps=1):
+        for _ in range(steps):
+            self.rng.random(out=self.rand)  # Random direction choices, the same for any number of workers
+            for _ in range(4):  # Start, copy done, even strips done, odd strips done
+                self.barrier.wait()
+            self.current = 1 - self.current
+            self.generation += 1
+
+    # Function for getting a copy of the current state (grid, water_amount, smoke_life)
+    def state(self):
+        return self.grids[self.current].copy(), self.water.copy(), self.smoke.copy()
+
+    # Function for stopping the workers and freeing the shared memory
+    def close(self):
+        if self.workers:
+            self.stop.value = 1
+            try:
+                self.barrier.wait()
+            except BrokenBarrierError:
+                pass
+            for process in self.workers:
+                process.join()
+            self.workers = []
+        del self.grids, self.water, self.smoke, self.rand
+        for memory in self.memories:
+            memory.close()
+            memory.unlink()
+        self.memories = []
+
+
+# Function for measuring the step time for 1..max_workers workers on the same world
+def benchmark_scaling(size=1024, steps=10, max_workers=None, strip_rows=STRIP_ROWS, seed=0):
+    from avatar import create_initial_state
+    np.random.seed(seed)
+    grid = create_initial_state(size)
+    max_workers = max_workers or os.cpu_count()
+
+    results, reference = [], None
+    for workers in range(1, max_workers + 1):
+        simulation = StripSimulation(grid, workers=workers, strip_rows=strip_rows, seed=seed)
+        try:
+            simulation.step()  # Compiles the kernel in every worker
+            start = time.perf_counter()
+            simulation.step(steps)
+            elapsed = time.perf_counter() - start
+            final = simulation.state()[0]
+        finally:
+            simulation.close()
+
+        if reference is None:
+            reference = final
+        same = np.array_equal(final, reference)  # Must not depend on the number of workers
+        speedup = results[0][1] / elapsed if results else 1.0
+        results.append((workers, elapsed, speedup, same))
+        print(f"{workers} procesov: {steps / elapsed:.2f} korakov/s, pohitritev {speedup:.2f}x, "
+              f"{'enak' if same else 'RAZLIČEN'} rezultat")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merjenje skaliranja vzporedne simulacije peska")
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--workers", type=int, help="največje število procesov")
+    parser.add_argument("--strip-rows", type=int, default=STRIP_ROWS)
+    args = parser.parse_args()
+    benchmark_scaling(args.size, args.steps, args.workers, args.strip_rows)
@@ -0,0 +1,147 @@
+import csv
+import json
+import time
+from collections import deque
+import numpy as np
+from avatar import update_cell, SMOKE_DARK, SMOKE_LIGHT, WATER
+
+# Opt-in instrumentation of the sand steppers. Set world.profiler (or avatar.profiler for the grid-only
+# functions) to a StepProfiler and every step records:
+#   - wall time per phase: per material for the python loops (update_cell timed per cell),
+#     per numbered section for step_fast, the whole kernel for numba
+#   - cells processed and cells changed per material (material at the start of the step)
+#   - total water mass (all of water_amount, also thin water in EMPTY cells and water frozen under ICE),
+#     water mass in WATER cells and number of smoke cells after the step
+# Without a profiler the steppers run their plain loops, nothing is timed or counted.
+
+MATERIAL_NAMES = ('empty', 'wall', 'sand', 'wood', 'fire', 'smoke_dark', 'smoke_light', 'water', 'ice')
+MATERIAL_PHASES = ('empty', 'wall', 'sand', 'wood', 'fire', 'smoke', 'smoke', 'water', 'ice')  # Phase of every material
+
+# Slovene labels for the HUD
+PHASE_LABELS = {'empty': 'prazno', 'wall': 'stena', 'sand': 'pesek', 'wood': 'les', 'fire': 'ogenj',
+                'smoke': 'dim', 'water': 'voda', 'ice': 'led', 'kernel': 'jedro', 'setup': 'priprava'}
+
+
+class StepProfiler:
+    # capacity: number of steps kept, older steps are dropped (ring buffer)
+    def __init__(self, capacity=1000):
+        self.records = deque(maxlen=capacity)
+        self.origin = time.perf_counter()  # Time 0 of the trace
+        self.current = None  # Record of the step in progress
+        self.old_grid = None
+        self.mark = None
+
+    # Function for starting a step, phases are timed from here on
+    def begin(self, world, backend):
+        self.old_grid = world.grid.copy()  # Wood under water changes the grid in place
+        self.mark = time.perf_counter()
+        self.current = {'generation': world.generation + 1, 'backend': backend, 'start': self.mark - self.origin,
+                        'phases': {}}
+
+    # Function for ending the phase that started at the previous mark
+    def lap(self, name):
+        now = time.perf_counter()
+        phases = self.current['phases']
+        phases[name] = phases.get(name, 0.0) + now - self.mark
+        self.mark = now
+
+    # Function for updating the given cells with update_cell, timing every cell by its material
+    def update_cells(self, cells, grid, new_grid, water_amount, smoke_life, rand):
+        times = [0.0] * len(MATERIAL_NAMES)
+        counts = [0] * len(MATERIAL_NAMES)
+        clock = time.perf_counter
+        for i, j in cells:
+            material = grid[i, j]
+            start = clock()
+            update_cell(grid, new_grid, water_amount, smoke_life, i, j, rand)
+            times[material] += clock() - start
+            counts[material] += 1
+
+        phases = self.current['phases']
+        for material, seconds in enumerate(times):
+            if counts[material]:
+                name = MATERIAL_PHASES[material]
+                phases[name] = phases.get(name, 0.0) + seconds
+        self.current['cells'] = counts
+        self.mark = clock()
+
+    # Function for finishing a step and storing its record in the ring buffer
+    def end(self, world):
+        record = self.current
+        record['duration'] = time.perf_counter() - self.origin - record['start']
+        old, new = self.old_grid, world.grid
+        if 'cells' not in record:  # Whole-grid steppers process every inner cell
+            record['cells'] = np.bincount(old[1:-1, 1:-1].ravel(), minlength=len(MATERIAL_NAMES)).tolist()
+        record['moved'] = np.bincount(old[old != new], minlength=len(MATERIAL_NAMES)).tolist()
+        record['water_mass'] = float(world.water_amount.sum(dtype=np.float64))  # Conserved by step_fast
+        record['water_visible'] = float(world.water_amount[new == WATER].sum(dtype=np.float64))
+        record['smoke'] = int(np.count_nonzero((new == SMOKE_DARK) | (new == SMOKE_LIGHT)))
+        self.records.append(record)
+        self.current = self.old_grid = None
+
+    # Function for getting the stored steps as flat rows (oldest first)
+    def rows(self):
+        phases = sorted({name for record in self.records for name in record['phases']})
+        rows = []
+        for record in self.records:
+            row = {'generation': record['generation'], 'backend': record['backend'],
+                   'start': record['start'], 'duration': record['duration']}
+            row.update({f'time_{name}': record['phases'].get(name, 0.0) for name in phases})
+            row.update({f'cells_{name}': n for name, n in zip(MATERIAL_NAMES, record['cells'])})
+            row.update({f'moved_{name}': n for name, n in zip(MATERIAL_NAMES, record['moved'])})
+            row.update({'water_mass': record['water_mass'], 'water_visible': record['water_visible'],
+                        'smoke': record['smoke']})
+            rows.append(row)
+        return rows
+
+    # Function for writing the stored steps as CSV, one row per step (times in seconds)
+    def write_csv(self, path):
+        rows = self.rows()
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['generation'])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    # Function for writing the stored steps as a Chrome trace (chrome://tracing, Perfetto)
+    # Per-material times of the python loops are sums over interleaved cells, they are drawn one after another
+    def write_chrome_trace(self, path):
+        events = []
+        for record in self.records:
+            start = record['start'] * 1e6
+            events.append({'name': f"korak {record['generation']}", 'cat': record['backend'], 'ph': 'X',
+                           'ts': start, 'dur': record['duration'] * 1e6, 'pid': 0, 'tid': 0,
+                           'args': dict(zip(MATERIAL_NAMES, record['moved']))})
+            for name, seconds in record['phases'].items():
+                events.append({'name': name, 'cat': 'phase', 'ph': 'X', 'ts': start, 'dur': seconds * 1e6,
+                               'pid': 0, 'tid': 0})
+                start += seconds * 1e6
+            events.append({'name': 'svet', 'ph': 'C', 'ts': record['start'] * 1e6, 'pid': 0,
+                           'args': {'water_mass': record['water_mass'], 'water_visible': record['water_visible'],
+                                    'smoke': record['smoke']}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    # Function for a short text summary of the last step (for a HUD)
+    def hud(self):
+        if not self.records:
+            return ""
+        record = self.records[-1]
+        moved = dict(zip(MATERIAL_PHASES, [0] * len(MATERIAL_PHASES)))
+        for material, n in enumerate(record['moved']):
+            moved[MATERIAL_PHASES[material]] += n
+        lines = [f"korak {record['generation']} ({record['backend']}): {record['duration'] * 1000:.1f} ms"]
+        for name, seconds in sorted(record['phases'].items(), key=lambda item: -item[1]):
+            changed = f", {moved[name]} spremenjenih" if name in moved else ""
+            lines.append(f"{PHASE_LABELS.get(name, name)}: {seconds * 1000:.2f} ms{changed}")
+        lines.append(f"masa vode: {record['water_mass']:.2f} (vidne {record['water_visible']:.2f}), "
+                     f"celice dima: {record['smoke']}")
+        return "\n".join(lines)
+
+    # Function for writing the stored steps by extension: .csv or .json (Chrome trace)
+    def write(self, path):
+        if path.endswith('.csv'):
+            self.write_csv(path)
+        elif path.endswith('.json'):
+            self.write_chrome_trace(path)
+        else:
+            raise ValueError(f"Unknown profile format: {path}")
@@ -0,0 +1,225 @@
+import argparse
+import json
+import zipfile
+import numpy as np
+
+# Checkpoint and replay log of a sand world (grid, water_amount, smoke_life).
+# One zip file holds a full keyframe every `keyframe_interval` generations and, for every generation in
+# between, the XOR delta to the previous one, run-length encoded (only the runs of changed cells are stored).
+# Any generation is restored from the keyframe before it plus at most keyframe_interval - 1 deltas,
+# playing a run back only decodes deltas, nothing is simulated.
+# Worlds with a seed (World.step_rng) can be continued from any stored generation with the same result.
+
+FIELDS = ('grid', 'water_amount', 'smoke_life')
+KEYFRAME_INTERVAL = 100
+
+
+# Function for the raw bits of a field as unsigned integers (floats by their bit pattern), so XOR is exact
+def field_bits(data):
+    return np.ascontiguousarray(data).reshape(-1).view(f'u{data.dtype.itemsize}')
+
+
+# Function for encoding the XOR of two states of a field as runs: n_runs, starts, lengths, changed values
+def encode_delta(old, new):
+    xor = field_bits(old) ^ field_bits(new)
+    changed = xor != 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], changed, [False])).astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    header = np.array([len(starts)], dtype=np.uint32)
+    return b''.join((header.tobytes(), starts.astype(np.uint32).tobytes(),
+                     (ends - starts).astype(np.uint32).tobytes(), xor[changed].tobytes()))
+
+
+# Function for applying an encoded delta to a field in place
+def apply_delta(data, delta):
+    runs = int(np.frombuffer(delta, dtype=np.uint32, count=1)[0])
+    starts = np.frombuffer(delta, dtype=np.uint32, count=runs, offset=4).astype(np.int64)
+    lengths = np.frombuffer(delta, dtype=np.uint32, count=runs, offset=4 + 4 * runs).astype(np.int64)
+    bits = field_bits(data)
+    values = np.frombuffer(delta, dtype=bits.dtype, offset=4 + 8 * runs)
+    # Flat index of every changed cell: each run's start plus the position inside the run
+    run_offsets = np.cumsum(lengths) - lengths
+    idx = np.repeat(starts - run_offsets, lengths) + np.arange(len(values))
+    bits[idx] ^= values
+
+
+# Recorder that appends the states of a run to a replay file (same interface as the headless writers)
+class ReplayWriter:
+    needs_frames = False
+
+    # start: generation of the first state; append=True continues a file that ends at generation start - 1
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, seed=None, start=0, append=False):
+        self.zip = zipfile.ZipFile(path, 'a' if append else 'w', compression=zipfile.ZIP_DEFLATED,
+                                   allowZip64=True)
+        self.keyframe_interval = keyframe_interval
+        self.seed = seed
+        self.generation = start
+        self.last = None  # Previous state, base of the next delta
+        if append:
+            replay = Replay(self.zip)
+            if replay.last != start - 1:
+                raise ValueError(f"Replay ends at generation {replay.last}, cannot continue at {start}")
+            self.keyframe_interval = replay.keyframe_interval
+            self.last = replay.state(replay.last)
+
+    # Function for storing the next state (dict with the FIELDS)
+    def write(self, frame, state):
+        if any(name not in state for name in FIELDS):
+            raise ValueError("Replay files store sand worlds (types 3/4)")
+        state = {name: np.array(state[name]) for name in FIELDS}
+        if self.last is None and 'meta.json' not in self.zip.namelist():
+            meta = {'shape': state['grid'].shape, 'dtypes': {name: state[name].dtype.str for name in FIELDS},
+                    'keyframe_interval': self.keyframe_interval, 'seed': self.seed, 'start': self.generation}
+            self.zip.writestr('meta.json', json.dumps(meta))
+
+        if self.last is None or self.generation % self.keyframe_interval == 0:
+            for name in FIELDS:
+                self.zip.writestr(f'key/{self.generation:08d}/{name}', state[name].tobytes())
+        else:
+            for name in FIELDS:
+                self.zip.writestr(f'delta/{self.generation:08d}/{name}', encode_delta(self.last[name], state[name]))
+        self.last = state
+        self.generation += 1
+
+    # Function for storing the current state of a world
+    def record(self, world):
+        self.write(None, {'grid': world.grid, 'water_amount': world.water_amount, 'smoke_life': world.smoke_life})
+
+    def close(self):
+        self.zip.close()
+
+
+# Reader of a replay file: random access to any stored generation and sequential playback
+class Replay:
+    def __init__(self, source):
+        self.zip = source if isinstance(source, zipfile.ZipFile) else zipfile.ZipFile(source, 'r')
+        meta = json.loads(self.zip.read('meta.json'))
+        self.shape = tuple(meta['shape'])
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in meta['dtypes'].items()}
+        self.keyframe_interval = meta['keyframe_interval']
+        self.seed = meta['seed']
+        self.first = meta['start']
+
+        self.keyframes = []
+        self.last = self.first - 1
+        for name in self.zip.namelist():
+            kind, _, rest = name.partition('/')
+            if kind in ('key', 'delta'):
+                generation = int(rest.partition('/')[0])
+                self.last = max(self.last, generation)
+                if kind == 'key' and rest.endswith('/grid'):
+                    self.keyframes.append(generation)
+        self.keyframes.sort()
+
+    # Function for reading all fields of a keyframe
+    def keyframe(self, generation):
+        return {name: np.frombuffer(self.zip.read(f'key/{generation:08d}/{name}'), dtype=self.dtypes[name])
+                .reshape(self.shape).copy() for name in FIELDS}
+
+    # Function for moving a state one generation forward in place (keyframe or delta)
+    def advance(self, state, generation):
+        if f'key/{generation:08d}/grid' in self.zip.NameToInfo:
+            state.update(self.keyframe(generation))
+        else:
+            for name in FIELDS:
+                apply_delta(state[name], self.zip.read(f'delta/{generation:08d}/{name}'))
+
+    # Function for restoring the state of any stored generation
+    def state(self, generation):
+        if not self.first <= generation <= self.last:
+            raise IndexError(f"Generation {generation} not in replay ({self.first}..{self.last})")
+        key = self.keyframes[np.searchsorted(self.keyframes, generation, side='right') - 1]
+        state = self.keyframe(key)
+        for g in range(key + 1, generation + 1):
+            self.advance(state, g)
+        return state
+
+    # Function for playing back generations start..stop-1, yields (generation, state) (the state is reused)
+    def frames(self, start=None, stop=None):
+        start = self.first if start is None else start
+        stop = self.last + 1 if stop is None else min(stop, self.last + 1)
+        if start >= stop:
+            return
+        state = self.state(start)
+        yield start, state
+        for generation in range(start + 1, stop):
+            self.advance(state, generation)
+            yield generation, state
+
+    # Function for getting a World at a stored generation, stepping it continues the recorded run
+    def world(self, generation=None):
+        from avatar import World
+        generation = self.last if generation is None else generation
+        state = self.state(generation)
+        world = World(state['grid'], state['water_amount'], state['smoke_life'], seed=self.seed)
+        world.generation = generation
+        return world
+
+    def close(self):
+        self.zip.close()
+
+
+# Function for continuing a recorded run by `steps` generations, appended to the same file
+def resume(path, steps, backend='python'):
+    replay = Replay(path)
+    try:
+        if replay.seed is None:
+            print("Opozorilo: zapis nima semena, nadaljevanje ne bo enako neprekinjenemu teku")
+        world = replay.world()
+    finally:
+        replay.close()
+    writer = ReplayWriter(path, start=world.generation + 1, append=True)
+    try:
+        for _ in range(steps):
+            world.step(backend)
+            writer.record(world)
+    finally:
+        writer.close()
+    return world
+
+
+# Function for showing a stored run in a window, frames are decoded from disk, not simulated
+def play(path, start=None, stop=None, interval=30):
+    from matplotlib import pyplot as plt
+    import matplotlib.animation as animation
+    from avatar import render_grid
+
+    replay = Replay(path)
+    frames = replay.frames(start, stop)
+    _, state = next(frames)
+    fig, ax = plt.subplots()
+    img = ax.imshow(render_grid(state['grid'], state['water_amount']))
+
+    def update(item):
+        generation, state = item
+        img.set_data(render_grid(state['grid'], state['water_amount']))
+        ax.set_title(f"Generacija {generation}")
+        return img,
+
+    ani = animation.FuncAnimation(fig, update, frames=frames, interval=interval, repeat=False,
+                                  cache_frame_data=False)
+    plt.show()
+    replay.close()
+    return ani
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predvajanje in nadaljevanje zapisanih simulacij")
+    parser.add_argument("path", help="datoteka z zapisom (.replay)")
+    parser.add_argument("--play", action="store_true", help="predvajaj zapis v oknu")
+    parser.add_argument("--start", type=int, help="prva generacija")
+    parser.add_argument("--stop", type=int, help="generacija za zadnjo")
+    parser.add_argument("--resume", type=int, metavar="KORAKI", help="nadaljuj simulacijo za toliko korakov")
+    parser.add_argument("--backend", default="python", choices=["python", "numpy", "numba"])
+    args = parser.parse_args()
+
+    if args.resume:
+        world = resume(args.path, args.resume, args.backend)
+        print(f"Simulacija nadaljevana do generacije {world.generation}")
+    elif args.play:
+        play(args.path, args.start, args.stop)
+    else:
+        replay = Replay(args.path)
+        print(f"Generacije {replay.first}..{replay.last}, mreža {replay.shape[0]}x{replay.shape[1]}, "
+              f"{len(replay.keyframes)} ključnih slik (vsakih {replay.keyframe_interval}), seme {replay.seed}")
+        replay.close()
@@ -0,0 +1,100 @@
+import numpy as np
+from two import compile_rule, generate_next_gen_rule, DEFAULT_RULE
+
+# Sparse backend for 2D rule automata on an unbounded plane.
+# Cells live in a dict of fixed-size uint8 chunks; a chunk exists only while it has non-zero cells.
+# A step only visits the chunks with cells and the neighbors that live cells at their edges can reach,
+# so memory and step time follow the population instead of the bounding box.
+
+CHUNK_SIZE = 64
+NEIGHBORS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+
+class SparseGrid:
+    def __init__(self, rule=DEFAULT_RULE, chunk_size=CHUNK_SIZE):
+        if isinstance(rule, str):
+            rule = compile_rule(rule)
+        if 0 in rule.birth:
+            raise ValueError("Rules with B0 would fill the whole unbounded plane")
+        self.rule = rule
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (chunk row, chunk col) -> chunk_size x chunk_size uint8 array
+        self.generation = 0
+
+    # Function for getting the chunks whose cells can change in the next generation
+    def candidates(self):
+        size = self.chunk_size
+        keys = set(self.chunks)
+        for (row, col), chunk in self.chunks.items():
+            alive = chunk == 1  # Only alive cells can cause births in a neighboring chunk
+            top, bottom, left, right = alive[0].any(), alive[-1].any(), alive[:, 0].any(), alive[:, -1].any()
+            sides = {(-1, 0): top, (1, 0): bottom, (0, -1): left, (0, 1): right,
+                     (-1, -1): alive[0, 0], (-1, 1): alive[0, size - 1],
+                     (1, -1): alive[size - 1, 0], (1, 1): alive[size - 1, size - 1]}
+            keys.update((row + dr, col + dc) for (dr, dc), reaches in sides.items() if reaches)
+        return list(keys)
+
+    # Function for advancing all chunks by one generation (one batched rule call on padded chunks)
+    def step_once(self):
+        keys = self.candidates()
+        if not keys:
+            self.generation += 1
+            return
+        size = self.chunk_size
+        # Rows/cols of a neighbor chunk that end up in the 1-cell ring around a chunk
+        source = {-1: slice(size - 1, size), 0: slice(0, size), 1: slice(0, 1)}
+        target = {-1: slice(0, 1), 0: slice(1, size + 1), 1: slice(size + 1, size + 2)}
+
+        padded = np.zeros((len(keys), size + 2, size + 2), dtype=np.uint8)
+        for b, (row, col) in enumerate(keys):
+            for dr, dc in NEIGHBORS:
+                chunk = self.chunks.get((row + dr, col + dc))
+                if chunk is not None:
+                    padded[b, target[dr], target[dc]] = chunk[source[dr], source[dc]]
+
+        new_chunks = generate_next_gen_rule(padded, self.rule)[:, 1:-1, 1:-1]
+        occupied = new_chunks.reshape(len(keys), -1).any(axis=1)
+        self.chunks = {key: new_chunks[b].copy() for b, key in enumerate(keys) if occupied[b]}  # Empty ones are freed
+        self.generation += 1
+
+    # Function for advancing any number of generations
+    def step(self, generations=1):
+        for _ in range(generations):
+            self.step_once()
+
+    # Function for counting alive cells
+    def population(self):
+        return int(sum(np.count_nonzero(chunk == 1) for chunk in self.chunks.values()))
+
+    # Function for getting the bounding box (top, left, bottom, right) of all chunks, None if empty
+    def bounds(self):
+        if not self.chunks:
+            return None
+        rows = [row for row, _ in self.chunks]
+        cols = [col for _, col in self.chunks]
+        size = self.chunk_size
+        return min(rows) * size, min(cols) * size, (max(rows) + 1) * size, (max(cols) + 1) * size
+
+    # Function for loading a dense grid with its top-left cell at world (top, left)
+    def from_grid(self, grid, top=0, left=0):
+        size = self.chunk_size
+        rows, cols = np.nonzero(grid)
+        for row, col in {(int(top + r) // size, int(left + c) // size) for r, c in zip(rows, cols)}:
+            chunk = self.chunks.setdefault((row, col), np.zeros((size, size), dtype=np.uint8))
+            r0, c0 = row * size - top, col * size - left  # Chunk origin in grid coordinates
+            gr0, gc0 = max(r0, 0), max(c0, 0)
+            gr1, gc1 = min(r0 + size, grid.shape[0]), min(c0 + size, grid.shape[1])
+            chunk[gr0 - r0:gr1 - r0, gc0 - c0:gc1 - c0] = grid[gr0:gr1, gc0:gc1]
+
+    # Function for drawing a window of the world into a dense grid (viewport for rendering)
+    def to_grid(self, rows, cols=None, top=0, left=0):
+        cols = rows if cols is None else cols
+        size = self.chunk_size
+        grid = np.zeros((rows, cols), dtype=np.uint8)
+        for (row, col), chunk in self.chunks.items():  # Only existing chunks, not every chunk of the window
+            r0, c0 = row * size - top, col * size - left
+            gr0, gc0 = max(r0, 0), max(c0, 0)
+            gr1, gc1 = min(r0 + size, rows), min(c0 + size, cols)
+            if gr0 < gr1 and gc0 < gc1:
+                grid[gr0:gr1, gc0:gc1] = chunk[gr0 - r0:gr1 - r0, gc0 - c0:gc1 - c0]
+        return grid
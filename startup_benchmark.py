@@ -0,0 +1,63 @@
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup time of main.py, measured in fresh processes (every run pays the full import cost).
+# The 1D and 2D modes should cost about as much as importing NumPy; matplotlib and the tiles
+# are shown for reference, the tiles both without (cold) and with (warm) the decoded atlas cache.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(BASE_DIR, "main.py")
+ATLAS = f"import sys; sys.path.insert(0, {BASE_DIR!r}); import avatar; avatar.get_atlas()"
+
+
+# Function for removing the cached atlas, so the next load decodes the PNGs again
+def clear_atlas_cache():
+    for path in glob.glob(os.path.join(BASE_DIR, "tiles_atlas_*.npy")):
+        os.remove(path)
+
+
+# Function for measuring the median wall time of a command over `repeat` fresh processes
+def time_command(command, repeat=5, before=None):
+    times = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=BASE_DIR)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+# Function for running all measurements, returns {name: seconds}
+def benchmark_startup(repeat=5):
+    python = sys.executable
+    cases = [
+        ("python", [python, "-c", "pass"], None),
+        ("import numpy", [python, "-c", "import numpy"], None),
+        ("import matplotlib.pyplot", [python, "-c", "import matplotlib.pyplot"], None),
+        ("main.py 1 --headless", [python, MAIN, "1", "--headless", "--steps", "1"], None),
+        ("main.py 2 --headless", [python, MAIN, "2", "--headless", "--steps", "1"], None),
+        ("ploščice (hladno)", [python, "-c", ATLAS], clear_atlas_cache),
+        ("ploščice (toplo)", [python, "-c", ATLAS], None),
+    ]
+    results = {}
+    for name, command, before in cases:
+        results[name] = time_command(command, repeat, before)
+        print(f"{name:28s} {results[name] * 1000:8.1f} ms")
+
+    numpy_time = results["import numpy"]
+    for name in ("main.py 1 --headless", "main.py 2 --headless"):
+        print(f"{name}: {results[name] / numpy_time:.2f}x časa uvoza NumPy")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merjenje časa zagona")
+    parser.add_argument("--repeat", type=int, default=5, help="število ponovitev (mediana)")
+    args = parser.parse_args()
+    benchmark_startup(args.repeat)
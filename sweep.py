@@ -0,0 +1,204 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from multiprocessing import Pool, shared_memory
+from one import get_rule_binary, generate_next_gen_1d_fast
+from two import create_initial_state_2d, parse_rule, compile_rule, generate_next_gen_rule
+
+# Rule-space sweep: characterize many (rule, seed, size) jobs on a process pool.
+# Workers write their metrics straight into a shared-memory result array, the main process only
+# collects finished job indices and saves a checkpoint now and then, so a sweep can be resumed.
+
+METRICS = ('density', 'entropy', 'transient', 'period')
+COLUMNS = ('kind', 'rule', 'seed', 'size', 'steps') + METRICS
+
+
+# Function for parsing rule numbers like "0-255" or "30,90,110"
+def parse_rule_numbers(text):
+    numbers = []
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            numbers.extend(range(int(first), int(last) + 1))
+        else:
+            numbers.append(int(part))
+    return numbers
+
+
+# Function for getting a Life-like rule and all rules that differ from it in one B or S digit
+def rule_family(rule_string):
+    birth, survival, states = parse_rule(rule_string)
+    suffix = f"/C{states}" if states > 2 else ""
+    rules = [compile_rule(rule_string).name]
+    for digit in range(9):
+        new_birth = sorted(set(birth) ^ {digit})
+        new_survival = sorted(set(survival) ^ {digit})
+        rules.append(f"B{''.join(map(str, new_birth))}/S{''.join(map(str, survival))}{suffix}")
+        rules.append(f"B{''.join(map(str, birth))}/S{''.join(map(str, new_survival))}{suffix}")
+    return rules
+
+
+# Function for creating the job list, one job per (rule, seed, size)
+def make_jobs(rules_1d=(), rules_2d=(), seeds=(0,), sizes=(64,), steps=500):
+    jobs = []
+    for kind, rules in (('1d', rules_1d), ('2d', rules_2d)):
+        for rule in rules:
+            for size in sizes:
+                for seed in seeds:
+                    jobs.append((kind, str(rule), seed, size, steps))
+    return jobs
+
+
+# Function for computing the Shannon entropy (bits per cell) of 3-cell (1D) or 2x2 (2D) blocks
+def block_entropy(cells, states=2):
+    cells = cells.astype(np.int64)  # Block codes go up to states^4, more than uint8 grids can hold
+    if cells.ndim == 1:
+        codes = (np.roll(cells, 1) * states + cells) * states + np.roll(cells, -1)
+        block = 3
+    else:
+        codes = ((cells[:-1, :-1] * states + cells[:-1, 1:]) * states + cells[1:, :-1]) * states + cells[1:, 1:]
+        block = 4
+    counts = np.bincount(codes.ravel())
+    p = counts[counts > 0] / codes.size
+    return float((p * np.log2(1 / p)).sum() / block)
+
+
+# Function for running one job: density, entropy, transient length and period (-1 if no cycle was found)
+def run_job(job):
+    kind, rule, seed, size, steps = job
+    np.random.seed(seed)
+    if kind == '1d':
+        rule_binary = get_rule_binary(int(rule))
+        cells = np.random.randint(0, 2, size).astype(np.uint8)
+        states = 2
+
+        def step(cells):
+            return generate_next_gen_1d_fast(cells, rule_binary, 'periodic')  # Finite ring, so it must cycle
+    else:
+        compiled = compile_rule(rule)
+        cells = create_initial_state_2d(size, fill_ratio=0.40).astype(np.uint8)
+        states = compiled.states
+
+        def step(cells):
+            return generate_next_gen_rule(cells, compiled)
+
+    seen = {}  # Hash of a state -> first generation it was seen
+    transient = period = -1
+    for t in range(steps + 1):
+        key = hash(cells.tobytes())
+        if key in seen:
+            transient, period = seen[key], t - seen[key]
+            break
+        seen[key] = t
+        if t < steps:
+            cells = step(cells)
+
+    inner = cells if kind == '1d' else cells[2:-2, 2:-2]  # Leave out the fixed border
+    return np.array([np.mean(inner == 1), block_entropy(inner, states), transient, period])
+
+
+# Shared state of a worker process
+worker_jobs = None
+worker_results = None
+worker_memory = None
+
+
+# Function for attaching a worker process to the job list and the shared result array
+def init_worker(jobs, memory_name):
+    global worker_jobs, worker_results, worker_memory
+    worker_jobs = jobs
+    worker_memory = shared_memory.SharedMemory(name=memory_name)
+    worker_results = np.ndarray((len(jobs), len(METRICS)), dtype=np.float64, buffer=worker_memory.buf)
+
+
+# Function for running a job in a worker, the result goes into the shared array
+def run_worker(index):
+    worker_results[index] = run_job(worker_jobs[index])
+    return index
+
+
+# Function for saving the checkpoint (written to a temporary file first, so it is never half written)
+def save_checkpoint(path, jobs, results, done):
+    with open(path + '.tmp', 'wb') as file:
+        np.savez(file, jobs=np.array([repr(job) for job in jobs]), results=results, done=done)
+    os.replace(path + '.tmp', path)
+
+
+# Function for loading a checkpoint of the same job list
+def load_checkpoint(path, jobs):
+    with np.load(path) as checkpoint:
+        if list(checkpoint['jobs']) != [repr(job) for job in jobs]:
+            raise ValueError(f"Checkpoint {path} belongs to a different sweep")
+        return checkpoint['results'], checkpoint['done']
+
+
+# Function for running all jobs on a process pool, resuming from the checkpoint if it exists
+def run_sweep(jobs, workers=None, checkpoint=None, checkpoint_every=30.0):
+    workers = workers or os.cpu_count()
+    memory = shared_memory.SharedMemory(create=True, size=max(1, len(jobs) * len(METRICS) * 8))
+    try:
+        results = np.ndarray((len(jobs), len(METRICS)), dtype=np.float64, buffer=memory.buf)
+        results[:] = np.nan
+        done = np.zeros(len(jobs), dtype=bool)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            results[:], done[:] = load_checkpoint(checkpoint, jobs)
+            print(f"Nadaljujem: {done.sum()}/{len(jobs)} opravil že končanih")
+
+        todo = np.flatnonzero(~done).tolist()
+        chunk_size = max(1, len(todo) // (workers * 8))  # Small chunks keep the workers evenly loaded
+        last_save = time.perf_counter()
+        with Pool(workers, initializer=init_worker, initargs=(jobs, memory.name)) as pool:
+            for index in pool.imap_unordered(run_worker, todo, chunksize=chunk_size):
+                done[index] = True
+                if checkpoint is not None and time.perf_counter() - last_save > checkpoint_every:
+                    save_checkpoint(checkpoint, jobs, results, done)
+                    last_save = time.perf_counter()
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, jobs, results, done)
+        return results.copy()
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+# Function for writing the summary table (.csv, or .parquet with pandas)
+def write_table(path, jobs, results):
+    rows = [list(job) + list(metrics) for job, metrics in zip(jobs, results)]
+    if path.endswith('.parquet'):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError("Za Parquet potrebujete pandas in pyarrow (pip install pandas pyarrow)")
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(path, index=False)
+        return
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pregled prostora pravil")
+    parser.add_argument("--rules-1d", default="", help="elementarna pravila, npr. 0-255 ali 30,90,110")
+    parser.add_argument("--rules-2d", nargs="*", default=[], help="B/S pravila")
+    parser.add_argument("--family", nargs="*", default=[], help="B/S pravilo in vse sosednje različice")
+    parser.add_argument("--seeds", type=int, default=1, help="število semen na pravilo")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--checkpoint", help="datoteka za nadaljevanje (.npz)")
+    parser.add_argument("-o", "--output", default="sweep.csv", help="izhodna tabela .csv ali .parquet")
+    args = parser.parse_args()
+
+    rules_2d = list(args.rules_2d)
+    for rule in args.family:
+        rules_2d.extend(rule_family(rule))
+    rules_1d = parse_rule_numbers(args.rules_1d) if args.rules_1d else []
+    jobs = make_jobs(rules_1d, rules_2d, range(args.seeds), args.sizes, args.steps)
+
+    start = time.perf_counter()
+    results = run_sweep(jobs, args.workers, args.checkpoint)
+    write_table(args.output, jobs, results)
+    print(f"Pregled končan: {len(jobs)} opravil v {time.perf_counter() - start:.2f} s -> {args.output}")
@@ -0,0 +1,131 @@
+import os
+import shutil
+import threading
+import weakref
+import numpy as np
+import pytest
+
+import avatar
+
+# Statistical equivalence of World.step_fast (phase-split masks) and World.step('python') (update_cell loops)
+# step_fast moves every particle at most once and keeps all sand and water, while the loops let two grains
+# move into the same cell and drop water below 0.01, so the grids differ cell by cell.
+# Material counts and their trends must agree within the tolerances below.
+
+STEPS = 40
+COUNT_TOLERANCE = 0.08  # Largest difference of a material count after STEPS, as a fraction of all cells
+TREND_THRESHOLD = 0.01  # Changes smaller than this fraction of all cells count as no trend
+SAND_KEPT = 0.75  # Smallest fraction of the sand the loops keep (step_fast keeps all of it)
+BURNING = [avatar.FIRE, avatar.SMOKE_DARK, avatar.SMOKE_LIGHT]
+
+
+# Function for summing the counts into groups whose trends both steppers share
+# Thin water is WATER for step_fast and EMPTY for the loops, so the two are one group
+def trend_groups(counts):
+    return np.stack([counts[..., avatar.EMPTY] + counts[..., avatar.WATER], counts[..., avatar.WOOD],
+                     counts[..., BURNING].sum(axis=-1)], axis=-1)
+
+
+# Function for counting the cells of every material
+def material_counts(grid):
+    return np.bincount(grid.ravel(), minlength=avatar.ICE + 1)
+
+
+# Function for stepping one world with both steppers, returns the counts at the start and after every step
+def run_both(create_world, size, seed):
+    loop_world, fast_world = create_world(size, seed), create_world(size, seed)
+    start = material_counts(loop_world.grid)
+    loop_counts, fast_counts = [], []
+    for _ in range(STEPS):
+        loop_counts.append(material_counts(loop_world.step('python')))
+        fast_counts.append(material_counts(fast_world.step_fast()))
+    return start, np.array(loop_counts), np.array(fast_counts)
+
+
+@pytest.mark.parametrize('create_world, size', [(avatar.create_initial_world, 60), (avatar.create_test_world, 20)])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_step_fast_statistically_equivalent(create_world, size, seed):
+    start, loop_counts, fast_counts = run_both(create_world, size, seed)
+    cells = size * size
+
+    # Walls never move
+    assert (loop_counts[:, avatar.WALL] == start[avatar.WALL]).all()
+    assert (fast_counts[:, avatar.WALL] == start[avatar.WALL]).all()
+
+    # Every material ends with about the same count
+    difference = np.abs(loop_counts[-1] - fast_counts[-1])
+    assert (difference <= COUNT_TOLERANCE * cells).all(), (loop_counts[-1], fast_counts[-1])
+
+    # Sand is kept by step_fast, the loops lose (or copy) a few grains
+    assert (fast_counts[:, avatar.SAND] == start[avatar.SAND]).all()
+    assert loop_counts[-1, avatar.SAND] >= SAND_KEPT * start[avatar.SAND]
+
+    # Empty space, wood and burning cells clearly grow or shrink with both steppers
+    loop_trend = trend_groups(loop_counts[-1]) - trend_groups(start)
+    fast_trend = trend_groups(fast_counts[-1]) - trend_groups(start)
+    clear = np.maximum(np.abs(loop_trend), np.abs(fast_trend)) > TREND_THRESHOLD * cells
+    assert (np.sign(loop_trend[clear]) == np.sign(fast_trend[clear])).all(), (start, loop_trend, fast_trend)
+
+    # Fire burns out and the smoke clears with both steppers
+    assert loop_counts[-1, BURNING].sum() <= TREND_THRESHOLD * cells
+    assert fast_counts[-1, BURNING].sum() <= TREND_THRESHOLD * cells
+
+
+def test_step_fast_keeps_sand_and_water():
+    world = avatar.create_test_world(20, seed=0)
+    sand, water = material_counts(world.grid)[avatar.SAND], world.water_amount.sum(dtype=np.float64)
+    for _ in range(STEPS):
+        world.step_fast()
+        assert material_counts(world.grid)[avatar.SAND] == sand
+        assert world.water_mass == pytest.approx(water, abs=1e-4)
+
+
+# The tile cache cleanup removes caches of older textures but not the temp files of other processes
+def test_load_tiles_keeps_other_temp_files(tmp_path, monkeypatch):
+    pytest.importorskip('PIL')
+    tiles_dir = tmp_path / 'tiles'
+    shutil.copytree(avatar.TILES_DIR, tiles_dir)
+    monkeypatch.setattr(avatar, 'TILES_DIR', str(tiles_dir))
+    monkeypatch.setattr(avatar, 'tiles', None)
+    old_cache = tmp_path / 'tiles_atlas_0000000000000000.npy'
+    other_temp = tmp_path / 'tiles_atlas_0000000000000000.npy.1.tmp.npy'
+    old_cache.write_bytes(b'')
+    other_temp.write_bytes(b'')
+
+    loaded = avatar.load_tiles()
+    assert loaded.shape == (len(avatar.TILE_FILES), avatar.TILE_PX, avatar.TILE_PX, 3)
+    assert not old_cache.exists()
+    assert other_temp.exists()
+    assert sorted(path.name for path in tmp_path.glob('tiles_atlas_*')) == \
+        sorted([other_temp.name, os.path.basename(avatar.tiles_cache_path())])
+
+
+# Every cell of the frame is the texture of its tile, also when the grid is gathered in several bands
+def test_render_grid_draws_tiles(monkeypatch):
+    pytest.importorskip('PIL')
+    world = avatar.create_test_world(16, seed=0)
+    for _ in range(5):
+        world.step_fast()
+    tiles = avatar.tile_indices(world.grid, world.water_amount)
+    assert tiles.dtype == np.uint8
+    textures = np.asarray(avatar.load_tiles())
+    expected = np.concatenate([np.concatenate(list(textures[row]), axis=1) for row in tiles])
+
+    monkeypatch.setattr(avatar, 'RENDER_BAND_CELLS', 40)  # 2 grid rows per band
+    np.testing.assert_array_equal(avatar.render_grid(world.grid, world.water_amount), expected)
+
+
+# A thread keeps one frame: reused for the same size, replaced for another size, freed when the thread ends
+def test_render_grid_frame_per_thread():
+    pytest.importorskip('PIL')
+    small, large = avatar.create_test_world(16), avatar.create_test_world(20)
+    assert avatar.render_grid(small.grid, small.water_amount, 4) is avatar.render_grid(small.grid, small.water_amount, 4)
+    assert avatar.render_grid(large.grid, large.water_amount, 4).shape == (80, 80, 3)
+    assert avatar.frame_buffers.frame.shape == (80, 80, 3)
+
+    frames = []
+    thread = threading.Thread(target=lambda: frames.append(weakref.ref(
+        avatar.render_grid(small.grid, small.water_amount, 4))))
+    thread.start()
+    thread.join()
+    assert frames[0]() is None
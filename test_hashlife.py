@@ -0,0 +1,12 @@
+import pytest
+
+from hashlife import HashLife
+from sparse import SparseGrid
+
+
+# Empty space stays empty in both engines, so B0 rules (every empty cell is born) are rejected
+@pytest.mark.parametrize('engine', [HashLife, SparseGrid])
+@pytest.mark.parametrize('rule', ['B03/S23', 'B0/S', '0123/0'])
+def test_b0_rules_are_rejected(engine, rule):
+    with pytest.raises(ValueError):
+        engine(rule)
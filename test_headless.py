@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from headless import make_renderer, resolve_backend, run_headless, simulate
+
+
+# Every Generations state gets its own gray level, nothing wraps around past 255
+def test_generations_states_render_in_order():
+    render = make_renderer('2', 5, rule='B3/S23/C5')
+    frame = render({'grid': np.arange(5).reshape(1, 5)})
+    assert frame.shape == (1, 5, 3) and frame.dtype == np.uint8
+    assert (np.diff(frame[0, :, 0].astype(int)) > 0).all()
+
+
+def test_two_state_rule_renders_black_and_white():
+    frame = make_renderer('2', 2)({'grid': np.array([[0, 1]])})
+    np.testing.assert_array_equal(frame[0, :, 0], [0, 255])
+
+
+# 1D runs default to the whole-row NumPy stepper and give the same rows as the loop
+def test_1d_defaults_to_numpy():
+    assert resolve_backend('1') == 'numpy'
+    fast = [state['cells'] for state in simulate('1', 64, 20)]
+    loop = [state['cells'] for state in simulate('1', 64, 20, backend='python')]
+    np.testing.assert_array_equal(fast, loop)
+
+
+# Type 2 only has a NumPy stepper, other backends are rejected before any output is opened
+@pytest.mark.parametrize('backend', ['python', 'numba'])
+def test_type_2_rejects_other_backends(backend, tmp_path):
+    with pytest.raises(ValueError):
+        run_headless('2', steps=2, size=10, outputs=[str(tmp_path / 'run.npz')], backend=backend)
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+
+import avatar
+import interative
+
+
+# A new state is blitted into the grid axes, the figure is not redrawn
+def test_refresh_blits_only_the_image(monkeypatch):
+    editor = interative.Editor(avatar.create_test_world(16))
+    fig, ax = plt.subplots()
+    interative.draw_grid(editor, ax, 16).set_animated(True)
+    fig.canvas.mpl_connect('draw_event', lambda _: interative.save_background(editor, ax))
+    fig.canvas.draw()
+    assert editor.background is not None
+    before = np.asarray(fig.canvas.buffer_rgba()).copy()
+
+    monkeypatch.setattr(fig.canvas, 'draw_idle', lambda: pytest.fail("Figure redrawn"))
+    monkeypatch.setattr(fig.canvas, 'draw', lambda: pytest.fail("Figure redrawn"))
+    interative.paint(editor.world, avatar.FIRE, 1, 1, radius=3)
+    editor.simulation.publish()
+    interative.refresh(editor, ax, 16)
+
+    assert editor.version == editor.simulation.version
+    assert (np.asarray(fig.canvas.buffer_rgba()) != before).any()
+    plt.close(fig)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import avatar
+from one import get_rule_binary, generate_next_gen_1d
+from two import generate_next_gen_2d
+
+# Cross-backend equivalence: with the same seed every backend gives exactly the same result
+# Without Numba the kernels run as Python, so the scan order is still checked
+
+
+# Function for creating a seeded sand world with partial water levels (the scenes of avatar have little water)
+def create_wet_world(size, seed):
+    rng = np.random.default_rng(seed)
+    grid = rng.choice([avatar.EMPTY, avatar.WALL, avatar.SAND, avatar.WOOD, avatar.FIRE, avatar.WATER, avatar.ICE],
+                      size=(size, size), p=[0.3, 0.1, 0.15, 0.1, 0.05, 0.25, 0.05]).astype(avatar.CELL_DTYPE)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = avatar.WALL
+    water_amount = np.where(grid == avatar.WATER, rng.random(grid.shape), 0).astype(avatar.WATER_DTYPE)
+    return avatar.World(grid, water_amount, seed=seed)
+
+
+@pytest.mark.parametrize('rule_number', [30, 90, 110, 184])
+def test_1d_backends_agree(rule_number):
+    rule_binary = get_rule_binary(rule_number)
+    row = np.random.default_rng(rule_number).integers(0, 2, 200)
+    rows = {backend: row for backend in ('python', 'numpy', 'numba')}
+    for _ in range(30):
+        rows = {backend: generate_next_gen_1d(rows[backend], rule_binary, backend) for backend in rows}
+        np.testing.assert_array_equal(rows['numpy'], rows['python'])
+        np.testing.assert_array_equal(rows['numba'], rows['python'])
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_2d_backends_agree(seed):
+    grid = (np.random.default_rng(seed).random((40, 40)) < 0.45).astype(int)
+    grid[0:2, :] = grid[:, 0:2] = grid[-2:, :] = grid[:, -2:] = 0  # Fixed border
+    grids = {backend: grid for backend in ('python', 'numpy', 'numba')}
+    for _ in range(20):
+        grids = {backend: generate_next_gen_2d(grids[backend], backend) for backend in grids}
+        np.testing.assert_array_equal(grids['numpy'], grids['python'])
+        np.testing.assert_array_equal(grids['numba'], grids['python'])
+
+
+@pytest.mark.parametrize('create_world', [avatar.create_initial_world, avatar.create_test_world, create_wet_world])
+@pytest.mark.parametrize('seed', [1, 7])
+def test_sand_backends_agree(create_world, seed):
+    worlds = {backend: create_world(30, seed) for backend in ('python', 'numba')}
+    for generation in range(60):
+        for backend, world in worlds.items():
+            world.step(backend)
+        for field in ('grid', 'water_amount', 'smoke_life'):
+            np.testing.assert_array_equal(getattr(worlds['numba'], field), getattr(worlds['python'], field),
+                                          err_msg=f"{field} after generation {generation + 1}")
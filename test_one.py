@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from one import (BOUNDARY_MODES, get_rule_binary, generate_next_gen_1d, generate_next_gen_1d_fast,
+                 generate_next_gen_1d_packed, compile_rule_packed, pack_row, unpack_row)
+
+ROW = np.random.default_rng(0).integers(0, 2, 97)  # Every neighborhood 000..111 occurs
+
+
+# Function for one generation cell by cell, with the outside cells taken from np.pad
+def next_gen_reference(current_gen, rule_binary, boundary):
+    padded_gen = np.pad(current_gen, 1, mode=BOUNDARY_MODES[boundary])
+    return np.array([rule_binary[7 - (padded_gen[i] * 4 + padded_gen[i + 1] * 2 + padded_gen[i + 2])]
+                     for i in range(len(current_gen))])
+
+
+@pytest.mark.parametrize('rule_number', range(256))
+def test_fast_matches_loop(rule_number):
+    rule_binary = get_rule_binary(rule_number)
+    expected = generate_next_gen_1d(ROW, rule_binary)
+    result = generate_next_gen_1d_fast(ROW, rule_binary)
+    assert result.dtype == ROW.dtype
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize('boundary', sorted(BOUNDARY_MODES))
+@pytest.mark.parametrize('rule_number', range(256))
+def test_fast_boundaries(rule_number, boundary):
+    rule_binary = get_rule_binary(rule_number)
+    for row in (ROW, np.ones(5, dtype=int), np.array([1, 0, 0, 0, 1, 1])):  # Edges with 1 differ by boundary
+        np.testing.assert_array_equal(generate_next_gen_1d_fast(row, rule_binary, boundary),
+                                      next_gen_reference(row, rule_binary, boundary))
+
+
+def test_unknown_boundary():
+    with pytest.raises(ValueError):
+        generate_next_gen_1d_fast(ROW, get_rule_binary(30), 'mirror')
+    with pytest.raises(ValueError):
+        generate_next_gen_1d_packed(pack_row(ROW), len(ROW), compile_rule_packed(get_rule_binary(30)), 'mirror')
+
+
+@pytest.mark.parametrize('width', [1, 2, 3, 63, 64, 65, 127, 128, 129, 191, 192, 193])
+def test_pack_round_trip(width):
+    row = np.random.default_rng(width).integers(0, 2, width)
+    np.testing.assert_array_equal(unpack_row(pack_row(row), width), row)
+
+
+# Widths around the 64-bit word boundaries, where the edge cells and carries sit in different words
+@pytest.mark.parametrize('boundary', sorted(BOUNDARY_MODES))
+@pytest.mark.parametrize('width', [3, 63, 64, 65, 127, 128, 129, 191, 192, 193])
+@pytest.mark.parametrize('rule_number', [0, 1, 30, 45, 90, 110, 150, 184, 255])
+def test_packed_matches_fast(rule_number, width, boundary):
+    rule_binary = get_rule_binary(rule_number)
+    rule_fn = compile_rule_packed(rule_binary)
+    row = np.random.default_rng(width).integers(0, 2, width)
+    row[0] = row[-1] = 1
+    words = pack_row(row)
+    for _ in range(10):
+        row = generate_next_gen_1d_fast(row, rule_binary, boundary)
+        words = generate_next_gen_1d_packed(words, width, rule_fn, boundary)
+        np.testing.assert_array_equal(unpack_row(words, width), row)
+        assert not (unpack_row(words, len(words) * 64)[width:]).any()  # Bits past the row stay empty
+
+
+@pytest.mark.parametrize('rule_number', range(256))
+def test_packed_all_rules(rule_number):
+    rule_binary = get_rule_binary(rule_number)
+    words = generate_next_gen_1d_packed(pack_row(ROW), len(ROW), compile_rule_packed(rule_binary))
+    np.testing.assert_array_equal(unpack_row(words, len(ROW)), generate_next_gen_1d_fast(ROW, rule_binary))
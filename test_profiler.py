@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import avatar
+from profiler import StepProfiler
+
+
+# The reported water mass is all of water_amount, so it stays constant while step_fast conserves the water
+def test_water_mass_is_conserved_total():
+    world = avatar.create_test_world(40, seed=3)  # No ice, so no water melts into the scene
+    world.profiler = StepProfiler()
+    total = world.water_amount.sum(dtype=np.float64)
+    for _ in range(20):
+        world.step_fast()
+        record = world.profiler.records[-1]
+        assert record['water_mass'] == pytest.approx(world.water_mass, abs=1e-3)
+        assert record['water_mass'] == pytest.approx(total, abs=1e-3)
+        assert record['water_visible'] <= record['water_mass'] + 1e-6
+    assert 'water_visible' in world.profiler.rows()[-1]
+    assert "masa vode" in world.profiler.hud()
@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+
+from sweep import block_entropy
+
+
+# Block codes of Generations grids with 5 states go past 255, a uint8 grid must give the same entropy
+@pytest.mark.parametrize('shape', [(64, 64), (200,)])
+def test_block_entropy_does_not_wrap(shape):
+    cells = np.random.default_rng(0).integers(0, 5, shape)
+    assert block_entropy(cells.astype(np.uint8), states=5) == pytest.approx(block_entropy(cells, states=5))
+    if len(shape) == 2:
+        assert block_entropy(cells.astype(np.uint8), states=5) > 2.2  # log2(5) = 2.32 bits for random cells
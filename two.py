@@ -1,4 +1,10 @@
 import numpy as np
+from collections import namedtuple
+
+DEFAULT_RULE = "B678/S2345678"
+
+# Compiled rule: table[state, neighbors] -> next state
+Rule = namedtuple('Rule', ['name', 'birth', 'survival', 'states', 'table'])
 
 # Function for creating initial 2D state
 def create_initial_state_2d(size, fill_ratio=0.45):
@@ -7,7 +13,18 @@ def create_initial_state_2d(size, fill_ratio=0.45):
     return grid
 
 # Function for generating next generation for 2D automaton
-def generate_next_gen_2d(grid):
+# backend: 'python' (loop below), 'numpy' (generate_next_gen_2d_fast) or 'numba' (kernels.py)
+def generate_next_gen_2d(grid, backend='python'):
+    if backend == 'numpy':
+        return generate_next_gen_2d_fast(grid)
+    elif backend == 'numba':
+        from kernels import get_kernel
+        new_grid = np.copy(grid)
+        get_kernel('2d')(grid, new_grid)
+        return new_grid
+    elif backend != 'python':
+        raise ValueError(f"Unknown backend: {backend}")
+
     new_grid = np.copy(grid) # Copy the grid
     rows, cols = grid.shape
 
@@ -22,13 +39,92 @@ def generate_next_gen_2d(grid):
                     new_grid[i, j] = 1  # Cell is born
     return new_grid
 
+# Function for counting neighbors of all inner cells with separable shifted sums
+# Works on the last two axes, so a (B, H, W) stack of grids is counted in one go
+def count_neighbors_2d(grid):
+    column_sums = grid[..., :-2, :] + grid[..., 1:-1, :] + grid[..., 2:, :]  # Vertical 3-cell sums
+    block_sums = column_sums[..., :-2] + column_sums[..., 1:-1] + column_sums[..., 2:]  # 3x3 sums
+    return block_sums - grid[..., 1:-1, 1:-1]  # Sum of all neighbors except the cell itself
+
+# Function for generating next generation for 2D automaton on the whole grid at once
+def generate_next_gen_2d_fast(grid):
+    new_grid = np.copy(grid)
+    if min(grid.shape) < 3:
+        return new_grid  # Only the fixed border
+
+    inner = grid[1:-1, 1:-1]  # Ignore the fixed border
+    neighbors = count_neighbors_2d(grid)
+    dies = (inner == 1) & ((neighbors < 2) | (neighbors > 8))
+    born = (inner != 1) & (neighbors >= 6) & (neighbors <= 8)
+
+    new_inner = new_grid[1:-1, 1:-1]
+    new_inner[dies] = 0
+    new_inner[born] = 1
+    return new_grid
+
+# Function for parsing a rule string: "B678/S2345678", "B2/S345/C4" (Generations) or "345/2/4" (S/B/C)
+def parse_rule(rule_string):
+    parts = rule_string.strip().upper().split('/')
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid rule: {rule_string}")
+
+    if parts[0].startswith('B') or parts[0].startswith('S'):
+        fields = {part[:1]: part[1:] for part in parts}
+        if set(fields) - {'B', 'S', 'C', 'G'} or 'B' not in fields or 'S' not in fields:
+            raise ValueError(f"Invalid rule: {rule_string}")
+        birth, survival, states = fields['B'], fields['S'], fields.get('C', fields.get('G', '2'))
+    else:
+        survival, birth = parts[0], parts[1]  # Golly order: survival/birth/states
+        states = parts[2] if len(parts) == 3 else '2'
+
+    if not (birth + survival).isdigit() and (birth or survival):
+        raise ValueError(f"Invalid rule: {rule_string}")
+    if '9' in birth + survival or not states.isdigit() or int(states) < 2:
+        raise ValueError(f"Invalid rule: {rule_string}")
+    return sorted({int(x) for x in birth}), sorted({int(x) for x in survival}), int(states)
+
+# Function for compiling a rule string into a state x neighbor count lookup table
+def compile_rule(rule_string=DEFAULT_RULE):
+    birth, survival, states = parse_rule(rule_string)
+    table = np.zeros((states, 9), dtype=np.uint8)
+
+    table[0, birth] = 1  # Dead cell is born
+    table[1, :] = 2 if states > 2 else 0  # Alive cell starts dying (Generations) or dies
+    table[1, survival] = 1  # Alive cell survives
+    for state in range(2, states):
+        table[state, :] = (state + 1) % states  # Dying cells decay regardless of neighbors
+
+    name = f"B{''.join(map(str, birth))}/S{''.join(map(str, survival))}"
+    if states > 2:
+        name += f"/C{states}"
+    return Rule(name, birth, survival, states, table)
+
+# Function for generating next generation with a compiled rule (one grid or a (B, H, W) stack)
+def generate_next_gen_rule(grid, rule):
+    new_grid = np.copy(grid)
+    if min(grid.shape[-2:]) < 3:
+        return new_grid  # Only the fixed border
+
+    neighbors = count_neighbors_2d((grid == 1).astype(np.uint8))  # Only alive cells (state 1) count
+    codes = grid[..., 1:-1, 1:-1] * np.uint16(9) + neighbors  # (state, neighbors) -> flat table index
+    new_grid[..., 1:-1, 1:-1] = np.take(rule.table.ravel(), codes)  # Ignore the fixed border
+    return new_grid
+
 # Function for animating 2D automaton
-def animate2(frame_num, grid, img, stable_counter, ani):
-    new_grid = generate_next_gen_2d(grid)
+# With a detector (cycles.CycleDetector) the run stops as soon as a fixed point or cycle is found
+def animate2(frame_num, grid, img, stable_counter, ani, rule=None, detector=None):
+    if rule is None:
+        new_grid = generate_next_gen_2d_fast(grid)
+    else:
+        new_grid = generate_next_gen_rule(grid, rule)
     img.set_data(new_grid)
 
+    if detector is not None:
+        if detector.update([new_grid]):
+            print(detector.describe())
+            ani.event_source.stop()
     # Check if grid stabilized for 15 steps
-    if np.array_equal(grid, new_grid):
+    elif np.array_equal(grid, new_grid):
         stable_counter[0] += 1
     else:
         stable_counter[0] = 0  # Reset counter if grid changes